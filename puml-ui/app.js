@@ -12,6 +12,8 @@ class BianUMLVisualizer {
         this.currentTab = 'bian';
         this.currentDataModelTab = 'visualization';
         this.vocabularyData = null;
+        this.currentView = null;
+        this.staticBundle = null;
         this.init();
     }
 
@@ -52,6 +54,7 @@ class BianUMLVisualizer {
      */
     async init() {
         console.log('Initializing BIAN UML Visualizer...');
+        await this.loadStaticBundle();
         this.checkLibrarySupport();
         this.renderDiagramButtons();
         this.renderDataModelButtons();
@@ -64,6 +67,41 @@ class BianUMLVisualizer {
         console.log('BIAN UML Visualizer initialized successfully');
     }
 
+    /**
+     * Detect an offline static bundle (written by export_static.py)
+     */
+    async loadStaticBundle() {
+        try {
+            const response = await fetch('static-manifest.json');
+            if (response.ok) {
+                this.staticBundle = await response.json();
+                console.log(`📦 Static bundle mode: pre-rendered ${this.staticBundle.generated_at}`);
+            }
+        } catch (error) {
+            this.staticBundle = null;
+        }
+    }
+
+    /**
+     * Fetch a rendered diagram from the server, or from the static bundle when offline
+     */
+    async fetchRenderedDiagram(umlContent, format) {
+        if (!this.staticBundle) {
+            return fetch('/api/generate-diagram', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ uml_content: umlContent, format })
+            });
+        }
+        const view = this.staticBundle.views[this.currentView];
+        const asset = view && view.assets[format];
+        if (!asset) {
+            const error = 'This view is not pre-rendered in the static bundle (combined views need the server)';
+            return new Response(JSON.stringify({ error }), { status: 404, headers: { 'Content-Type': 'application/json' } });
+        }
+        return fetch(asset);
+    }
+
     /**
      * Check system support and show status
      */
@@ -77,6 +115,13 @@ class BianUMLVisualizer {
      * Check server health and PlantUML availability
      */
     async checkServerHealth() {
+        if (this.staticBundle) {
+            const statusElement = document.querySelector('.server-status');
+            if (statusElement) {
+                statusElement.innerHTML = `<span class="inline-block w-2 h-2 bg-blue-400 rounded-full mr-1"></span>Static bundle: ${this.staticBundle.generated_at}`;
+            }
+            return;
+        }
         try {
             const response = await fetch('/health');
             const health = await response.json();
@@ -214,7 +259,7 @@ class BianUMLVisualizer {
         documentationArea.innerHTML = '<div class="flex items-center justify-center h-32"><div class="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div><span class="ml-2">Loading documentation...</span></div>';
 
         try {
-            const response = await fetch('/Vocabulary/deposits_data_model_documentation.md');
+            const response = await fetch('Vocabulary/deposits_data_model_documentation.md');
             if (!response.ok) {
                 throw new Error('Documentation not found');
             }
@@ -264,7 +309,7 @@ class BianUMLVisualizer {
      */
     async downloadVocabulary() {
         try {
-            const response = await fetch('/Vocabulary/FinalVocab.json');
+            const response = await fetch('Vocabulary/FinalVocab.json');
             if (!response.ok) {
                 throw new Error('Vocabulary file not found');
             }
@@ -293,7 +338,7 @@ class BianUMLVisualizer {
 
         try {
             if (!this.vocabularyData) {
-                const response = await fetch('/Vocabulary/FinalVocab.json');
+                const response = await fetch('Vocabulary/FinalVocab.json');
                 if (!response.ok) {
                     throw new Error('Vocabulary file not found');
                 }
@@ -594,7 +639,7 @@ class BianUMLVisualizer {
     async loadAllDataModelContents() {
         const loadPromises = this.dataModelConfigs.map(async (config) => {
             try {
-                const response = await fetch(`/Vocabulary/${config.filename}`);
+                const response = await fetch(`Vocabulary/${config.filename}`);
                 if (response.ok) {
                     const content = await response.text();
                     this.umlContents.set(`datamodel_${config.id}`, content);
@@ -611,10 +656,26 @@ class BianUMLVisualizer {
         console.log('All data model contents loaded');
     }
 
+    /**
+     * Report a view change so the server can prerender the likely next views
+     */
+    recordNavigation(view, format = 'png') {
+        const fromView = this.currentView;
+        this.currentView = view;
+        if (!view || this.staticBundle) return;
+        fetch('/api/navigation', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ from: fromView, to: view, format })
+        }).catch(() => { /* prerendering is best effort */ });
+    }
+
     /**
      * Visualize specific data model
      */
     async visualizeDataModel(dataModelId) {
+        const config = this.dataModelConfigs.find(c => c.id === dataModelId);
+        if (config) this.recordNavigation(`datamodel:${config.filename}`);
         const visualizationArea = document.getElementById('dataModelVisualizationArea');
         visualizationArea.innerHTML = '<div class="flex items-center justify-center h-32"><div class="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div><span class="ml-2">Generating data model diagram...</span></div>';
 
@@ -649,11 +710,7 @@ class BianUMLVisualizer {
                 </div>
             `;
 
-            const response = await fetch('/api/generate-diagram', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ uml_content: umlContent, format: 'png' })
-            });
+            const response = await this.fetchRenderedDiagram(umlContent, 'png');
 
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
@@ -713,11 +770,9 @@ class BianUMLVisualizer {
      * Download data model as SVG
      */
     async downloadDataModelAsSVG(umlContent) {
+        this.recordNavigation(this.currentView, 'svg');
         try {
-            const response = await fetch('/api/generate-diagram', {
-                method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ uml_content: umlContent, format: 'svg' })
-            });
+            const response = await this.fetchRenderedDiagram(umlContent, 'svg');
             if (!response.ok) throw new Error('Failed to generate SVG');
             const svgContent = await response.text();
             this.downloadSVGContent(svgContent, `deposits-data-model-${Date.now()}.svg`);
@@ -810,7 +865,7 @@ class BianUMLVisualizer {
     async loadAllUMLContents() {
         const loadPromises = this.diagramConfigs.map(async (config) => {
             try {
-                const response = await fetch(`../ModularLandscape/PUML/${config.filename}`);
+                const response = await fetch(`ModularLandscape/PUML/${config.filename}`);
                 if (response.ok) {
                     const content = await response.text();
                     this.umlContents.set(config.id, content);
@@ -836,8 +891,11 @@ class BianUMLVisualizer {
             if (this.selectedDiagrams.size === 1) {
                 const diagramId = Array.from(this.selectedDiagrams)[0];
                 umlContent = this.umlContents.get(diagramId);
+                const config = this.diagramConfigs.find(c => c.id === diagramId);
+                this.recordNavigation(`diagram:${config.filename}`);
             } else {
                 umlContent = this.createCombinedUML();
+                this.currentView = null;
             }
             await this.renderUMLDiagram(umlContent);
         } catch (error) {
@@ -885,11 +943,7 @@ class BianUMLVisualizer {
                     <span class="text-gray-600">Generating diagram with local PlantUML...</span>
                 </div>
             `;
-            const response = await fetch('/api/generate-diagram', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ uml_content: umlContent, format: 'png' })
-            });
+            const response = await this.fetchRenderedDiagram(umlContent, 'png');
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
                 throw new Error(errorData.error || `Server error: ${response.status}`);
@@ -953,10 +1007,7 @@ class BianUMLVisualizer {
 
     async downloadAsPNG(umlContent) {
         try {
-            const response = await fetch('/api/generate-diagram', {
-                method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ uml_content: umlContent, format: 'png' })
-            });
+            const response = await this.fetchRenderedDiagram(umlContent, 'png');
             if (!response.ok) throw new Error('Failed to generate PNG');
             const blob = await response.blob();
             const url = URL.createObjectURL(blob);
@@ -967,11 +1018,9 @@ class BianUMLVisualizer {
     }
 
     async downloadAsSVG(umlContent) {
+        this.recordNavigation(this.currentView, 'svg');
         try {
-            const response = await fetch('/api/generate-diagram', {
-                method: 'POST', headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ uml_content: umlContent, format: 'svg' })
-            });
+            const response = await this.fetchRenderedDiagram(umlContent, 'svg');
             if (!response.ok) throw new Error('Failed to generate SVG');
             const svgContent = await response.text();
             this.downloadSVGContent(svgContent, `bian-diagram-${Date.now()}.svg`);
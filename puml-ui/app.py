@@ -7,12 +7,18 @@ Serves the HTML interface and provides API endpoints for UML file access
 from flask import Flask, render_template, send_from_directory, jsonify, request, Response
 import os
 import sys
-import subprocess
-import tempfile
-import uuid
 from pathlib import Path
-from typing import Union
-import re
+
+from render_governor import RenderRejected, content_hash
+from plantuml_renderer import (
+    PLANTUML_JAR, OUTPUT_DIR, governor, render_diagram, generate_plantuml_diagram,
+    post_process_render, check_graphviz_installations, check_java_availability
+)
+from render_dispatch import RenderDispatcher, LocalWorker, RemoteWorker
+from prerender import NavigationModel, Prerenderer
+from artifact_store import ArtifactStore, StoredArtifact, artifact_key
+from vocabulary_store import VocabularyStore
+from vocabulary_lineage import LineageIndex, NODE_KINDS
 
 app = Flask(__name__)
 
@@ -21,12 +27,87 @@ BASE_DIR = Path(__file__).parent
 PUML_DIR = BASE_DIR.parent / "ModularLandscape" / "PUML"
 VOCABULARY_DIR = BASE_DIR.parent / "Vocabulary"
 STATIC_DIR = BASE_DIR
-PLANTUML_JAR = BASE_DIR.parent / "plantuml.jar"
-OUTPUT_DIR = BASE_DIR / "png"  # Local directory for PlantUML output
 
 # Configure Flask
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching for development
 
+# Renders go to the least loaded render worker; the in-process PlantUML
+# pipeline is one worker, render_worker.py daemons listed in RENDER_WORKERS
+# (comma-separated URLs) or registered via /api/workers are others
+dispatcher = RenderDispatcher(health_interval=int(os.environ.get('RENDER_WORKER_HEALTH_INTERVAL', 10)))
+if os.environ.get('RENDER_LOCAL_WORKER', '1') != '0':
+    dispatcher.add_worker(LocalWorker(render_diagram, governor, PLANTUML_JAR))
+for worker_url in filter(None, (url.strip() for url in os.environ.get('RENDER_WORKERS', '').split(','))):
+    dispatcher.add_worker(RemoteWorker(worker_url, timeout=int(os.environ.get('RENDER_WORKER_TIMEOUT', 180))))
+dispatcher.start_health_checks()
+
+# Post-processed renders keyed by (content hash, format), persisted in a
+# memory-mapped pack so they survive restarts
+artifact_store = ArtifactStore(OUTPUT_DIR)
+
+def get_cached_render(key):
+    """Return the stored render for a (content hash, format) key, or None"""
+    return artifact_store.get(artifact_key(*key))
+
+def store_cached_render(key, entry):
+    """Append a post-processed render to the artifact pack"""
+    artifact_store.put(
+        artifact_key(*key),
+        entry['content'],
+        {'format': entry['format'], 'svg_stats': entry.get('svg_stats')}
+    )
+
+# Views the UI can navigate to, mapped to the directory holding their source
+VIEW_SOURCES = {
+    'diagram': PUML_DIR,
+    'datamodel': VOCABULARY_DIR,
+}
+
+def load_view_content(view):
+    """Read the UML source behind a view id such as 'diagram:bian_channels.puml'"""
+    kind, _, filename = (view or '').partition(':')
+    source_dir = VIEW_SOURCES.get(kind)
+    if source_dir is None or Path(filename).name != filename or not filename.endswith('.puml'):
+        return None
+    file_path = source_dir / filename
+    if not file_path.exists():
+        return None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def prerender_view(view, output_format):
+    """Speculatively render a predicted view into the render cache"""
+    uml_content = load_view_content(view)
+    if uml_content is None or not PLANTUML_JAR.exists():
+        return 'skipped'
+    cache_key = (content_hash(uml_content), output_format)
+    if get_cached_render(cache_key) is not None:
+        return 'cached'
+    try:
+        with governor.admit(uml_content, speculative=True) as ticket:
+            result = generate_plantuml_diagram(uml_content, output_format, ticket=ticket)
+            if ticket.cancelled:
+                return 'cancelled'
+    except RenderRejected:
+        return 'skipped'
+    if not result['success'] or result.get('fallback'):
+        return 'failed'
+    store_cached_render(cache_key, post_process_render(result['content'], output_format))
+    return 'rendered'
+
+# Vocabulary entries per domain, streamed in and reloaded incrementally in the background
+vocabulary_store = VocabularyStore(
+    VOCABULARY_DIR,
+    reload_interval=int(os.environ.get('VOCABULARY_RELOAD_INTERVAL', 5))
+)
+vocabulary_store.start_watching()
+# Linked-field lineage, rebuilt on first use after each vocabulary change
+lineage = LineageIndex(vocabulary_store)
+
+navigation_model = NavigationModel(model_file=OUTPUT_DIR / "navigation_model.json")
+prerenderer = Prerenderer(navigation_model, governor, prerender_view)
+PRERENDER_ENABLED = os.environ.get('PRERENDER_ENABLED', '1') != '0'
+
 @app.route('/')
 def index():
     """Serve the main HTML interface"""
@@ -107,9 +188,6 @@ def serve_vocabulary_file(filename):
         if file_path.suffix not in allowed_extensions:
             return f"Invalid file type", 400
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
         # Set appropriate content type
         content_type = 'text/plain; charset=utf-8'
         if file_path.suffix == '.json':
@@ -117,11 +195,108 @@ def serve_vocabulary_file(filename):
         elif file_path.suffix == '.md':
             content_type = 'text/markdown; charset=utf-8'
 
-        return content, 200, {'Content-Type': content_type}
+        # Streamed from disk so large vocabularies are never read into memory whole
+        return send_from_directory(VOCABULARY_DIR, filename, mimetype=content_type)
 
     except Exception as e:
         return f"Error reading file: {str(e)}", 500
 
+@app.route('/api/vocabulary')
+def list_vocabularies():
+    """List vocabulary domains with entry counts and last reload statistics"""
+    return jsonify({'domains': vocabulary_store.domains()})
+
+@app.route('/api/vocabulary/reload', methods=['POST'])
+def reload_vocabularies():
+    """Re-ingest changed vocabulary files in the background"""
+    force = bool((request.get_json(silent=True) or {}).get('force', False))
+    vocabulary_store.reload_in_background(force=force)
+    return jsonify({'status': 'reloading', 'force': force}), 202
+
+@app.route('/api/vocabulary/<domain>')
+def get_vocabulary_entries(domain):
+    """Paginated vocabulary entries of a domain, optionally filtered with ?q="""
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(1000, max(1, int(request.args.get('limit', 100))))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    page = vocabulary_store.entries(domain, request.args.get('q'), offset, limit)
+    if page is None:
+        return jsonify({'error': f'Vocabulary domain {domain} not found'}), 404
+    return jsonify(dict(page, domain=domain))
+
+@app.route('/api/vocabulary/<domain>/<key>')
+def get_vocabulary_entry(domain, key):
+    """A single vocabulary entry by key"""
+    entry = vocabulary_store.get(domain, key)
+    if entry is None:
+        return jsonify({'error': f'Vocabulary entry {domain}/{key} not found'}), 404
+    return jsonify(entry)
+
+@app.route('/api/lineage')
+def lineage_summary():
+    """Node and usage counts of the linked-field lineage graph"""
+    return jsonify(lineage.graph().summary())
+
+@app.route('/api/lineage/<kind>/<path:name>')
+def lineage_node(kind, name):
+    """Upstream and downstream lineage of a table, field, key or operation"""
+    graph = lineage.graph()
+    node = graph.resolve(kind, name) if kind in NODE_KINDS else None
+    if node is None:
+        return jsonify({'error': f'Lineage node {kind}:{name} not found'}), 404
+    return jsonify(graph.describe(node))
+
+@app.route('/api/lineage/<kind>/<path:name>/diagram')
+def lineage_diagram(kind, name):
+    """Lineage subgraph of a node as PlantUML source (?format=puml) or a rendered diagram"""
+    graph = lineage.graph()
+    node = graph.resolve(kind, name) if kind in NODE_KINDS else None
+    if node is None:
+        return jsonify({'error': f'Lineage node {kind}:{name} not found'}), 404
+    uml_content = graph.subgraph_puml(node)
+    output_format = request.args.get('format', 'svg')
+    if output_format == 'puml':
+        return uml_content, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return render_diagram_response(uml_content, output_format)
+
+@app.route('/api/workers', methods=['GET'])
+def list_render_workers():
+    """Registered render workers with health and queue depth"""
+    return jsonify(dispatcher.snapshot())
+
+@app.route('/api/workers', methods=['POST'])
+def register_render_worker():
+    """Register a remote render worker by URL"""
+    url = (request.get_json(silent=True) or {}).get('url', '')
+    if not url.startswith(('http://', 'https://')):
+        return jsonify({'error': 'A worker http(s) URL is required'}), 400
+    worker = dispatcher.add_worker(RemoteWorker(url, timeout=int(os.environ.get('RENDER_WORKER_TIMEOUT', 180))))
+    return jsonify(worker.snapshot()), 201
+
+@app.route('/api/workers', methods=['DELETE'])
+def unregister_render_worker():
+    """Remove a render worker by name (its URL, or 'local')"""
+    name = (request.get_json(silent=True) or {}).get('url', '')
+    if not dispatcher.remove_worker(name):
+        return jsonify({'error': f'Render worker {name} not registered'}), 404
+    return jsonify({'removed': name})
+
+@app.route('/api/navigation', methods=['POST'])
+def record_navigation():
+    """Record a view transition and schedule prerendering of likely next views"""
+    data = request.get_json(silent=True) or {}
+    to_view = data.get('to')
+    if not to_view or load_view_content(to_view) is None:
+        return jsonify({'error': 'Unknown view'}), 400
+    output_format = data.get('format', 'png')
+    if not PRERENDER_ENABLED:
+        navigation_model.record(data.get('from'), to_view, output_format)
+        return jsonify({'recorded': True, 'prerender': []})
+    scheduled = prerenderer.on_navigation(data.get('from'), to_view, output_format)
+    return jsonify({'recorded': True, 'prerender': scheduled})
+
 @app.route('/api/generate-diagram', methods=['POST'])
 def generate_diagram():
     """Generate UML diagram using local plantuml.jar"""
@@ -147,60 +322,78 @@ def generate_diagram():
         else:
             print(f"ℹ️  Normal fonts: large_fonts={large_fonts}, format={output_format}")
         
-        # Validate PlantUML jar exists
-        if not PLANTUML_JAR.exists():
-            return jsonify({'error': f'PlantUML jar not found at {PLANTUML_JAR}'}), 500
-        
-        # Generate diagram using PlantUML jar
-        result = generate_plantuml_diagram(uml_content, output_format)
-        
-        if result['success']:
-            # Determine proper MIME type
-            if output_format == 'svg':
-                mimetype = 'image/svg+xml'
-            elif output_format == 'png':
-                mimetype = 'image/png'
-            elif output_format == 'jpg' or output_format == 'jpeg':
-                mimetype = 'image/jpeg'
-            else:
-                mimetype = f'image/{output_format}'
-            
-            # Return the generated image
-            return Response(
-                result['content'],
-                mimetype=mimetype,
-                headers={
-                    'Content-Disposition': f'inline; filename="diagram.{output_format}"',
-                    'Cache-Control': 'no-cache',
-                    'Access-Control-Allow-Origin': '*'
-                }
-            )
-        else:
-            return jsonify({'error': result['error']}), 500
+        return render_diagram_response(uml_content, output_format)
             
     except Exception as e:
         return jsonify({'error': f'Error generating diagram: {str(e)}'}), 500
 
-def enforce_svg_white_background(svg_text: str) -> str:
-    """Ensure the returned SVG has a white background regardless of theme."""
-    if not svg_text:
-        return svg_text
-
-    updated = svg_text
-
-    # 1) Ensure the root svg tag has a white background style
-    if '<svg' in updated and 'background' not in updated.split('>')[0]:
-        updated = updated.replace('<svg', '<svg style="background:#FFFFFF"', 1)
+def render_diagram_response(uml_content, output_format):
+    """Serve a render from the cache, or render it on a worker and cache it"""
+    # Serve repeated renders from the post-processed cache
+    cache_key = (content_hash(uml_content), output_format)
+    cached = get_cached_render(cache_key)
+    if cached is not None:
+        print(f"⚡ Render cache hit for {cache_key[0][:12]} ({output_format})")
+        return build_diagram_response(cached, cache_status='hit')
 
-    # 2) Insert a white rect covering the viewBox/canvas right after the <svg ...>
-    has_rect = re.search(r'<rect[^>]+fill\s*=\s*"#?fff', updated, flags=re.IGNORECASE) is not None
-    if not has_rect:
-        # Try to extract explicit width/height from svg or viewBox
-        m_vb = re.search(r'viewBox\s*=\s*"([^"]+)"', updated)
-        rect_tag = '<rect x="0" y="0" width="100%" height="100%" fill="#FFFFFF"/>'
-        updated = re.sub(r'(<svg[^>]*>)', r"\1" + rect_tag, updated, count=1)
+    # Render and post-process on the least loaded render worker
+    try:
+        result, worker_name = dispatcher.render(uml_content, output_format)
+    except RenderRejected as e:
+        print(f"🚦 Render rejected: {e}")
+        headers = {'Retry-After': str(e.retry_after)} if e.retry_after else {}
+        return jsonify({'error': str(e)}), e.status, headers
+
+    if not result['success']:
+        return jsonify({'error': result['error']}), 500
+    entry = result['entry']
+    # Text fallbacks signal a failed render, so they are not cached
+    if not entry['fallback']:
+        store_cached_render(cache_key, entry)
+    response = build_diagram_response(entry, cache_status='miss')
+    response.headers['X-Render-Worker'] = worker_name
+    return response
+
+def build_diagram_response(entry, cache_status='miss'):
+    """Build the HTTP response for a rendered diagram cache entry"""
+    output_format = entry['format']
+    # Determine proper MIME type
+    if output_format == 'svg':
+        mimetype = 'image/svg+xml'
+    elif output_format == 'png':
+        mimetype = 'image/png'
+    elif output_format == 'jpg' or output_format == 'jpeg':
+        mimetype = 'image/jpeg'
+    else:
+        mimetype = f'image/{output_format}'
+
+    headers = {
+        'Content-Disposition': f'inline; filename="diagram.{output_format}"',
+        'Cache-Control': 'no-cache',
+        'Access-Control-Allow-Origin': '*',
+        'X-Render-Cache': cache_status
+    }
+    stats = entry.get('svg_stats')
+    if stats:
+        headers['X-SVG-Original-Size'] = str(stats['original_bytes'])
+        headers['X-SVG-Optimized-Size'] = str(stats['optimized_bytes'])
+        headers['X-SVG-Reduction'] = f"{stats['reduction_pct']}%"
+
+    if isinstance(entry, StoredArtifact):
+        # Hand the pack region to the WSGI server (sendfile under gunicorn)
+        # instead of copying it into a Python bytes object
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        pack_slice = entry.open_slice() if file_wrapper else None
+        if pack_slice is not None:
+            body = file_wrapper(pack_slice, 65536)
+        else:
+            body = [entry.payload.tobytes()]
+        response = Response(body, mimetype=mimetype, headers=headers, direct_passthrough=True)
+        response.content_length = len(entry)
+        return response
 
-    return updated
+    # Return the generated image
+    return Response(entry['content'], mimetype=mimetype, headers=headers)
 
 def enhance_uml_for_large_fonts(uml_content):
     """Enhance UML content with larger font specifications for better readability"""
@@ -242,419 +435,6 @@ def enhance_uml_for_large_fonts(uml_content):
         print(f"❌ Error enhancing UML for large fonts: {e}")
         return uml_content  # Return original if enhancement fails
 
-def convert_svg_to_png(svg_content):
-    """Convert SVG content to PNG using Python libraries as fallback"""
-    try:
-        # Try using cairosvg if available
-        try:
-            import cairosvg
-            png_data = cairosvg.svg2png(bytestring=svg_content.encode('utf-8'))
-            return {
-                'success': True,
-                'content': png_data,
-                'method': 'cairosvg'
-            }
-        except ImportError:
-            pass
-        
-        # Try using wand (ImageMagick) if available
-        try:
-            from wand.image import Image
-            from wand.color import Color
-            
-            with Image() as img:
-                img.format = 'svg'
-                img.read(blob=svg_content.encode('utf-8'))
-                img.format = 'png'
-                img.background_color = Color('white')
-                png_data = img.make_blob()
-                return {
-                    'success': True,
-                    'content': png_data,
-                    'method': 'wand'
-                }
-        except ImportError:
-            pass
-        
-        # Try using Pillow with svg2rlg if available
-        try:
-            from reportlab.graphics import renderPM
-            from svglib.svglib import renderSVG
-            import io
-            
-            # Convert SVG to ReportLab drawing
-            svg_file = io.StringIO(svg_content)
-            drawing = renderSVG.renderSVG(svg_file)
-            
-            # Render to PNG
-            png_data = renderPM.drawToPIL(drawing, fmt='PNG')
-            img_buffer = io.BytesIO()
-            png_data.save(img_buffer, format='PNG')
-            
-            return {
-                'success': True,
-                'content': img_buffer.getvalue(),
-                'method': 'reportlab'
-            }
-        except ImportError:
-            pass
-        
-        return {
-            'success': False,
-            'error': 'No SVG to PNG conversion libraries available. Install cairosvg, wand, or reportlab+svglib.'
-        }
-        
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'SVG to PNG conversion failed: {str(e)}'
-        }
-
-def generate_plantuml_diagram(uml_content, output_format='svg'):
-    """Generate diagram using local PlantUML jar with local output directory"""
-    try:
-        # Helper: detect if returned SVG is an error image produced by PlantUML
-        def is_error_svg(svg_text: str) -> bool:
-            if not svg_text:
-                return True
-            indicators = [
-                "An error has occured",  # legacy spelling from PlantUML
-                "An error has occurred",
-                "GraphViz",
-                "plantuml.com/qa",
-                "java.lang.",
-                "UnparsableGraphvizException",
-            ]
-            return any(indicator in svg_text for indicator in indicators)
-
-        # Helper: run PlantUML via stdin/stdout (no temp files)
-        def run_plantuml_pipe(graphviz_dot: Union[str, None]):
-            cmd = [
-                'java',
-                '-Djava.awt.headless=true',
-            ]
-            if graphviz_dot is None:
-                # auto-detect
-                pass
-            elif graphviz_dot == "":
-                # Disable GraphViz completely (empty property)
-                cmd.append('-DGRAPHVIZ_DOT=')
-            else:
-                cmd.append(f'-DGRAPHVIZ_DOT={graphviz_dot}')
-
-            cmd += [
-                '-jar', str(PLANTUML_JAR),
-                f'-t{output_format}',
-                '-charset', 'UTF-8',
-                '-pipe',
-            ]
-
-            # For SVG we can capture as text; for PNG/JPG capture bytes
-            capture_as_text = (output_format == 'svg')
-            try:
-                result = subprocess.run(
-                    cmd,
-                    input=uml_content if capture_as_text else uml_content.encode('utf-8'),
-                    capture_output=True,
-                    text=capture_as_text,
-                    timeout=30
-                )
-                print(f"🧪 PIPE try ({graphviz_dot if graphviz_dot is not None else 'auto'}): exit={result.returncode}")
-                if result.stderr:
-                    print(f"⚠️  PIPE stderr: {result.stderr}")
-                    err_text = result.stderr if isinstance(result.stderr, str) else result.stderr.decode('utf-8', 'ignore')
-                    error_indicators = [
-                        'Cannot run program',
-                        'No such file or directory',
-                        'UnparsableGraphvizException',
-                        'java.lang.IllegalStateException',
-                    ]
-                    if any(x in err_text for x in error_indicators):
-                        return { 'success': False, 'error': err_text }
-
-                if result.returncode != 0:
-                    return { 'success': False, 'error': result.stderr or 'Non-zero exit' }
-
-                content = result.stdout if capture_as_text else result.stdout  # stdout contains bytes when text=False
-                if not capture_as_text:
-                    # When text=False, result.stdout is bytes
-                    content = result.stdout
-
-                if output_format == 'svg' and isinstance(content, str) and is_error_svg(content):
-                    return { 'success': False, 'error': 'PlantUML returned error SVG' }
-
-                # Heuristic: very small PNG likely error
-                if output_format == 'png' and isinstance(content, (bytes, bytearray)) and len(content) < 1000:
-                    return { 'success': False, 'error': 'PNG too small from PIPE' }
-
-                return { 'success': True, 'content': content }
-
-            except subprocess.TimeoutExpired:
-                return { 'success': False, 'error': 'PIPE timeout' }
-            except Exception as e:
-                return { 'success': False, 'error': f'PIPE exception: {e}' }
-
-        # Ensure output directory exists
-        OUTPUT_DIR.mkdir(exist_ok=True)
-
-        # Create per-run output subdirectory to avoid cross-run collisions
-        unique_id = str(uuid.uuid4())[:8]
-        RUN_DIR = OUTPUT_DIR / f"run_{unique_id}"
-        RUN_DIR.mkdir(exist_ok=True)
-
-        # Create unique filename inside run dir
-        input_file = RUN_DIR / f"diagram_{unique_id}.puml"
-        
-        # Write UML content to file
-        with open(input_file, 'w', encoding='utf-8') as f:
-            f.write(uml_content)
-        
-        print(f"📝 Created input file: {input_file}")
-        
-        # First attempt: PIPE mode (no filesystem). Prefer detected PATH GraphViz, skip non-existent hardcoded paths
-        detected = check_graphviz_installations()
-        detected_paths = [inst['path'] for inst in detected if os.path.exists(inst['path'])]
-        hardcoded_paths = [p for p in ['/opt/homebrew/bin/dot', '/usr/local/bin/dot'] if os.path.exists(p)]
-        pipe_attempts = detected_paths + hardcoded_paths + [None, ""]
-        for gv in pipe_attempts:
-            pipe_res = run_plantuml_pipe(gv)
-            if pipe_res.get('success'):
-                return {
-                    'success': True,
-                    'content': pipe_res['content'],
-                    'format': output_format,
-                    'method': f'pipe:{gv if gv is not None else "auto"}'
-                }
-            else:
-                print(f"❌ PIPE attempt failed ({gv if gv is not None else 'auto'}): {pipe_res.get('error')}")
-
-        # Fallback: file-based generation to support environments where -pipe might fail
-        base_cmd = [
-            'java', '-Djava.awt.headless=true', '-jar', str(PLANTUML_JAR),
-            f'-t{output_format}',
-            '-charset', 'UTF-8',
-            '-o', str(RUN_DIR),
-        ]
-        
-        # Try different GraphViz configurations: prefer detected PATH first
-        execution_attempts = []
-        for dot_path in detected_paths + hardcoded_paths:
-            execution_attempts.append((f"with GraphViz at {dot_path}", base_cmd + [f'-DGRAPHVIZ_DOT={dot_path}', str(input_file)]))
-        # Auto-detect
-        execution_attempts.append(("with Auto-detect GraphViz", base_cmd + [str(input_file)]))
-        # Disable GraphViz (empty property value - no quotes)
-        execution_attempts.append(("without GraphViz", base_cmd + ['-DGRAPHVIZ_DOT=', str(input_file)]))
-        
-        result = None
-        successful_cmd = None
-        
-        for attempt_name, cmd in execution_attempts:
-            print(f"🔧 Trying {attempt_name}: {' '.join(cmd)}")
-            
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30  # 30 second timeout
-                )
-                
-                print(f"📊 PlantUML exit code: {result.returncode}")
-                if result.stdout:
-                    print(f"📋 PlantUML stdout: {result.stdout}")
-                if result.stderr:
-                    print(f"⚠️  PlantUML stderr: {result.stderr}")
-                
-                # Treat GraphViz exceptions in stderr as failure even if exit code is 0
-                err_text = result.stderr or ""
-                if any(token in err_text for token in [
-                    'UnparsableGraphvizException',
-                    'java.lang.IllegalStateException',
-                    'Cannot run program',
-                    'No such file or directory'
-                ]):
-                    print(f"❌ Treating as failure due to GraphViz error in stderr for {attempt_name}")
-                    continue
-
-                if result.returncode == 0:
-                    successful_cmd = attempt_name
-                    print(f"✅ Success with {attempt_name}")
-                    break
-                else:
-                    print(f"❌ Failed with {attempt_name}")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"⏱️ Timeout with {attempt_name}")
-                continue
-            except Exception as e:
-                print(f"💥 Exception with {attempt_name}: {e}")
-                continue
-        
-        if not result or result.returncode != 0:
-            error_msg = result.stderr if result else "All execution attempts failed"
-            
-            # For PNG, try generating SVG first then converting
-            if output_format == 'png':
-                print("🔄 PNG failed, trying SVG generation then conversion...")
-                svg_result = generate_plantuml_diagram(uml_content, 'svg')
-                if svg_result['success']:
-                    print("✅ SVG generated, converting to PNG...")
-                    png_result = convert_svg_to_png(svg_result['content'])
-                    if png_result['success']:
-                        print(f"✅ PNG conversion successful using {png_result['method']}")
-                        return {
-                            'success': True,
-                            'content': png_result['content'],
-                            'format': 'png',
-                            'method': f"SVG->PNG via {png_result['method']}"
-                        }
-                    else:
-                        print(f"❌ PNG conversion failed: {png_result['error']}")
-            
-            # Try text-based fallback for SVG
-            if output_format == 'svg':
-                print("🔄 Trying text-based fallback...")
-                return generate_text_fallback_diagram(uml_content)
-            
-            return {
-                'success': False,
-                'error': f'PlantUML execution failed after all attempts. Last error: {error_msg}'
-            }
-        
-        # Look for generated output file - PlantUML creates subdirectories
-        # Check both the main output directory and nested subdirectories
-        possible_output_files = [
-            OUTPUT_DIR / f"diagram_{unique_id}.{output_format}",  # Direct in output dir
-            OUTPUT_DIR / f"{input_file.stem}.{output_format}",   # Stem naming
-            OUTPUT_DIR / "png" / f"diagram_{unique_id}.{output_format}",  # In nested subdir
-            OUTPUT_DIR / "png" / f"{input_file.stem}.{output_format}",   # Stem in subdir
-        ]
-        
-        # Only consider files with the unique stem to avoid picking unrelated outputs
-        all_output_files = list(RUN_DIR.glob(f"{input_file.stem}*.{output_format}"))
-        print(f"📁 Candidate {output_format} files for this run: {[str(f.name) for f in all_output_files]}")
-        if all_output_files:
-            newest_file = max(all_output_files, key=lambda f: f.stat().st_mtime)
-            possible_output_files.insert(0, newest_file)
-        
-        output_file = None
-        for possible_file in possible_output_files:
-            if possible_file.exists():
-                output_file = possible_file
-                print(f"✅ Found output file: {output_file}")
-                break
-        
-        if not output_file:
-            # No output file generated despite successful exit; fallback gracefully
-            if output_format == 'svg':
-                print("⚠️ No SVG produced; returning text-based fallback SVG")
-                return generate_text_fallback_diagram(uml_content)
-            if output_format == 'png':
-                print("⚠️ No PNG produced; generating text-based SVG then converting to PNG")
-                svg_fb = generate_text_fallback_diagram(uml_content)
-                if svg_fb.get('success'):
-                    png_conv = convert_svg_to_png(svg_fb['content'])
-                    if png_conv.get('success'):
-                        return {
-                            'success': True,
-                            'content': png_conv['content'],
-                            'format': 'png',
-                            'method': f"text-fallback SVG -> PNG via {png_conv.get('method','unknown')}"
-                        }
-                return {
-                    'success': False,
-                    'error': 'Failed to generate output via PlantUML and fallback conversion'
-                }
-            # Other formats unsupported for fallback
-            all_files = [f.name for f in RUN_DIR.iterdir()]
-            expected_names = [str(p.name) for p in possible_output_files]
-            return {
-                'success': False,
-                'error': (
-                    'Output file not generated. '
-                    f'Expected one of: {expected_names}. '
-                    f'All files in {RUN_DIR}: {all_files}'
-                )
-            }
-        
-        # Read generated content
-        if output_format == 'svg':
-            with open(output_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            # Detect error SVGs and fallback to text-based simplified SVG
-            if content and is_error_svg(content):
-                print("⚠️ Detected PlantUML error SVG. Using text-based fallback.")
-                return generate_text_fallback_diagram(uml_content)
-            # Enforce white background for SVG content
-            try:
-                content = enforce_svg_white_background(content)
-            except Exception as e:
-                print(f"⚠️ Failed to enforce white background on SVG: {e}")
-        else:
-            with open(output_file, 'rb') as f:
-                content = f.read()
-        
-        print(f"📄 Successfully read {len(content)} bytes from {output_file}")
-        
-        # Check if PNG is corrupted (very small file size indicates error)
-        if output_format == 'png' and len(content) < 1000:  # Less than 1KB is likely corrupted
-            print(f"⚠️ PNG file seems corrupted ({len(content)} bytes), trying SVG->PNG conversion...")
-            svg_result = generate_plantuml_diagram(uml_content, 'svg')
-            if svg_result['success']:
-                print("✅ SVG generated, converting to PNG...")
-                png_result = convert_svg_to_png(svg_result['content'])
-                if png_result['success']:
-                    print(f"✅ PNG conversion successful using {png_result['method']}")
-                    # Clean up corrupted file
-                    try:
-                        output_file.unlink()
-                        print(f"🗑️ Removed corrupted PNG: {output_file}")
-                    except:
-                        pass
-                    
-                    return {
-                        'success': True,
-                        'content': png_result['content'],
-                        'format': 'png',
-                        'method': f"SVG->PNG via {png_result['method']} (fallback)"
-                    }
-                else:
-                    print(f"❌ PNG conversion failed: {png_result['error']}")
-        
-        # Clean up input file (but keep output for debugging)
-        try:
-            input_file.unlink()
-            print(f"🧹 Cleaned up input file: {input_file}")
-        except:
-            pass
-
-        # Optional: clean run directory if empty
-        try:
-            remaining = list(RUN_DIR.iterdir())
-            if len(remaining) == 1 and remaining[0] == output_file:
-                # keep output; otherwise leave run dir contents for debugging
-                pass
-        except Exception as _:
-            pass
-        
-        return {
-            'success': True,
-            'content': content,
-            'format': output_format,
-            'output_file': str(output_file)
-        }
-        
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'error': 'PlantUML execution timed out (30 seconds)'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Error during diagram generation: {str(e)}'
-        }
-
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
@@ -666,137 +446,14 @@ def health_check():
         'plantuml_jar_exists': PLANTUML_JAR.exists(),
         'java_available': check_java_availability(),
         'graphviz_installations': graphviz_installations,
-        'graphviz_available': len(graphviz_installations) > 0
+        'graphviz_available': len(graphviz_installations) > 0,
+        'render_governor': governor.snapshot(),
+        'render_workers': dispatcher.snapshot(),
+        'artifact_store': artifact_store.snapshot(),
+        'vocabulary_domains': vocabulary_store.domains(),
+        'prerender': prerenderer.snapshot()
     })
 
-def generate_text_fallback_diagram(uml_content):
-    """Generate a text-based fallback when PlantUML/GraphViz fails"""
-    try:
-        # Parse the UML content to extract key information
-        lines = uml_content.strip().split('\n')
-        title = "UML Diagram"
-        elements = []
-        relationships = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('title '):
-                title = line[6:].strip()
-            elif ' -> ' in line:
-                parts = line.split(' -> ')
-                if len(parts) == 2:
-                    relationships.append((parts[0].strip(), parts[1].strip()))
-            elif line.startswith('class ') or line.startswith('package '):
-                elements.append(line)
-        
-        # Create a simple SVG-based text representation
-        svg_content = f"""<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 800 600" style="background:#f9f9f9;">
-    <style>
-        .title {{ font: bold 20px Arial; text-anchor: middle; }}
-        .element {{ font: 14px Arial; }}
-        .relationship {{ font: 12px Arial; }}
-        .error {{ font: 12px Arial; fill: #d32f2f; }}
-    </style>
-    
-    <!-- Title -->
-    <text x="400" y="30" class="title">{title}</text>
-    
-    <!-- Error Message -->
-    <text x="400" y="60" class="error" text-anchor="middle">
-        GraphViz Compatibility Issue - Showing Simplified View
-    </text>
-    
-    <!-- Elements -->"""
-        
-        y_pos = 100
-        for i, element in enumerate(elements[:10]):  # Limit to 10 elements
-            svg_content += f'\n    <text x="50" y="{y_pos}" class="element">{element}</text>'
-            y_pos += 25
-        
-        # Relationships
-        y_pos += 20
-        svg_content += '\n    <text x="50" y="' + str(y_pos) + '" class="element">Relationships:</text>'
-        y_pos += 25
-        
-        for relationship in relationships[:10]:  # Limit to 10 relationships
-            svg_content += f'\n    <text x="70" y="{y_pos}" class="relationship">{relationship[0]} → {relationship[1]}</text>'
-            y_pos += 20
-        
-        # Footer
-        svg_content += f'''
-    
-    <!-- Footer -->
-    <text x="400" y="550" class="error" text-anchor="middle">
-        To fix: Update PlantUML jar or downgrade GraphViz
-    </text>
-    <text x="400" y="570" class="error" text-anchor="middle">
-        Visit: https://plantuml.com/graphviz-dot
-    </text>
-</svg>'''
-        
-        return {
-            'success': True,
-            'content': svg_content,
-            'format': 'svg',
-            'fallback': True
-        }
-        
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Even text fallback failed: {str(e)}'
-        }
-
-def check_graphviz_installations():
-    """Check available GraphViz installations"""
-    installations = []
-    
-    # Check common GraphViz installation paths
-    paths_to_check = [
-        '/opt/homebrew/bin/dot',  # Homebrew on Apple Silicon
-        '/usr/local/bin/dot',     # Homebrew on Intel Mac / System install
-        '/usr/bin/dot',           # System package manager
-        'dot'                     # PATH environment
-    ]
-    
-    for dot_path in paths_to_check:
-        try:
-            if dot_path == 'dot':
-                # Check if dot is in PATH
-                result = subprocess.run(['which', 'dot'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    actual_path = result.stdout.strip()
-                    version_result = subprocess.run(['dot', '-V'], capture_output=True, text=True, timeout=5)
-                    if version_result.returncode == 0:
-                        installations.append({
-                            'path': actual_path,
-                            'type': 'PATH',
-                            'version': version_result.stderr.strip() if version_result.stderr else 'Unknown'
-                        })
-            else:
-                # Check specific path
-                if os.path.exists(dot_path):
-                    version_result = subprocess.run([dot_path, '-V'], capture_output=True, text=True, timeout=5)
-                    if version_result.returncode == 0:
-                        install_type = 'Homebrew' if '/homebrew/' in dot_path else 'System'
-                        installations.append({
-                            'path': dot_path,
-                            'type': install_type,
-                            'version': version_result.stderr.strip() if version_result.stderr else 'Unknown'
-                        })
-        except:
-            continue
-    
-    return installations
-
-def check_java_availability():
-    """Check if Java is available for running PlantUML"""
-    try:
-        result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=5)
-        return result.returncode == 0
-    except:
-        return False
-
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
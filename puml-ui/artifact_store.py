@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Artifact pack store for the BIAN UML Visualizer
+Rendered diagrams are appended to a single pack file with a compact hash
+index. The pack is memory-mapped on startup so hits are served as
+memoryview slices (or sendfile where the WSGI server supports it), and a
+background thread compacts away superseded or evicted artifacts.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+PACK_MAGIC = b'BIANPK01'
+INDEX_MAGIC = b'BIANIX01'
+# key digest, entry offset, metadata length, payload length
+INDEX_RECORD = struct.Struct('<32sQII')
+ENTRY_HEADER = struct.Struct('<I')  # metadata length, followed by metadata JSON
+TOMBSTONE = 0xFFFFFFFFFFFFFFFF
+
+
+def artifact_key(*parts):
+    """32-byte index key for a cache key such as (content hash, format)"""
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).digest()
+
+
+class StoredArtifact:
+    """A zero-copy view of one artifact in the pack"""
+
+    def __init__(self, meta, payload, offset, pack_file, pack_inode):
+        self.meta = meta
+        self.payload = payload  # memoryview into the mmap
+        self.offset = offset
+        self.pack_file = pack_file
+        self.pack_inode = pack_inode
+
+    def __len__(self):
+        return len(self.payload)
+
+    def __getitem__(self, name):
+        return self.meta[name]
+
+    def get(self, name, default=None):
+        return self.meta.get(name, default)
+
+    def open_slice(self):
+        """File-like object over just this artifact, suitable for sendfile
+
+        Returns None if the pack was compacted since the artifact was read.
+        """
+        pack_slice = PackSlice(self.pack_file, self.offset, len(self.payload))
+        if os.fstat(pack_slice.fileno()).st_ino != self.pack_inode:
+            pack_slice.close()
+            return None
+        return pack_slice
+
+
+class PackSlice:
+    """Bounded reader over a region of the pack file
+
+    Owns a file descriptor positioned at the start of the region, so WSGI
+    servers that implement ``wsgi.file_wrapper`` with sendfile (gunicorn)
+    can send it zero-copy given a Content-Length.
+    """
+
+    def __init__(self, pack_file, offset, length):
+        self._fd = os.open(pack_file, os.O_RDONLY)
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        self._remaining = length
+
+    def fileno(self):
+        return self._fd
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = os.read(self._fd, size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ArtifactStore:
+    """Append-only, memory-mapped pack of rendered artifacts"""
+
+    def __init__(self, directory, name='artifacts', max_bytes=None, compact_interval=60):
+        self.directory = Path(directory)
+        self.pack_file = self.directory / f'{name}.pack'
+        self.index_file = self.directory / f'{name}.idx'
+        self.max_bytes = max_bytes or int(os.environ.get('ARTIFACT_STORE_MAX_MB', 512)) * 1024 * 1024
+        self.compact_interval = compact_interval
+
+        self._index = {}      # key -> (entry offset, meta length, payload length), oldest first
+        self._meta = {}       # key -> decoded metadata, filled lazily
+        self._map = None
+        self._map_size = 0
+        self._map_inode = None
+        self._live_bytes = 0
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._compactor = None
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'compactions': 0}
+
+        started = time.monotonic()
+        self._open()
+        self.load_ms = round((time.monotonic() - started) * 1000, 2)
+        print(f"🗄️ Artifact store loaded {len(self._index)} artifacts in {self.load_ms}ms")
+
+    # ------------------------------------------------------------------
+    # Opening and loading
+    # ------------------------------------------------------------------
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path, magic in ((self.pack_file, PACK_MAGIC), (self.index_file, INDEX_MAGIC)):
+            if not path.exists() or path.stat().st_size < len(magic):
+                with open(path, 'wb') as f:
+                    f.write(magic)
+
+        self._pack = open(self.pack_file, 'ab')
+        self._idx = open(self.index_file, 'ab')
+        pack_size = self.pack_file.stat().st_size
+
+        with open(self.index_file, 'rb') as f:
+            data = f.read()
+        if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f'{self.index_file} is not an artifact index')
+        body = data[len(INDEX_MAGIC):]
+        # A torn final record from a crash is ignored
+        usable = len(body) - len(body) % INDEX_RECORD.size
+        index = {}
+        for key, offset, meta_len, payload_len in INDEX_RECORD.iter_unpack(body[:usable]):
+            index.pop(key, None)
+            if offset == TOMBSTONE:
+                continue
+            if offset + ENTRY_HEADER.size + meta_len + payload_len > pack_size:
+                continue  # entry was never fully written
+            index[key] = (offset, meta_len, payload_len)
+        self._index = index
+        self._live_bytes = sum(ENTRY_HEADER.size + m + p for _, m, p in index.values())
+        self._remap()
+
+    def _remap(self):
+        size = self.pack_file.stat().st_size
+        if size == 0:
+            self._map, self._map_size = None, 0
+            return
+        with open(self.pack_file, 'rb') as f:
+            # Old maps stay alive while memoryviews into them are in use
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_inode = os.fstat(f.fileno()).st_ino
+        self._map_size = size
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """Return a StoredArtifact for ``key`` or None"""
+        with self._read_lock:
+            location = self._index.get(key)
+            if location is None:
+                self.stats['misses'] += 1
+                return None
+            offset, meta_len, payload_len = location
+            end = offset + ENTRY_HEADER.size + meta_len + payload_len
+            if end > self._map_size:
+                self._remap()
+            view = memoryview(self._map)
+            meta = self._meta.get(key)
+            if meta is None:
+                meta_start = offset + ENTRY_HEADER.size
+                meta = json.loads(bytes(view[meta_start:meta_start + meta_len]))
+                self._meta[key] = meta
+            payload_offset = offset + ENTRY_HEADER.size + meta_len
+            self.stats['hits'] += 1
+            return StoredArtifact(
+                meta, view[payload_offset:end], payload_offset, str(self.pack_file), self._map_inode
+            )
+
+    def __contains__(self, key):
+        with self._read_lock:
+            return key in self._index
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def put(self, key, payload, meta=None):
+        """Append an artifact; a later put for the same key supersedes it"""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        meta_bytes = json.dumps(meta or {}, separators=(',', ':')).encode('utf-8')
+        with self._write_lock:
+            offset = self._pack.tell()
+            self._pack.write(ENTRY_HEADER.pack(len(meta_bytes)))
+            self._pack.write(meta_bytes)
+            self._pack.write(payload)
+            self._pack.flush()
+            # The index record is only written once the entry is complete
+            self._idx.write(INDEX_RECORD.pack(key, offset, len(meta_bytes), len(payload)))
+            self._idx.flush()
+            with self._read_lock:
+                superseded = self._index.pop(key, None)
+                if superseded is not None:
+                    self._live_bytes -= ENTRY_HEADER.size + superseded[1] + superseded[2]
+                self._index[key] = (offset, len(meta_bytes), len(payload))
+                self._meta.pop(key, None)
+                self._live_bytes += ENTRY_HEADER.size + len(meta_bytes) + len(payload)
+                self.stats['writes'] += 1
+            self._evict_locked()
+        self._ensure_compactor()
+
+    def delete(self, key):
+        with self._write_lock:
+            self._delete_locked(key)
+
+    def _delete_locked(self, key):
+        with self._read_lock:
+            location = self._index.pop(key, None)
+            self._meta.pop(key, None)
+            if location is None:
+                return
+            self._live_bytes -= ENTRY_HEADER.size + location[1] + location[2]
+        self._idx.write(INDEX_RECORD.pack(key, TOMBSTONE, 0, 0))
+        self._idx.flush()
+
+    def _evict_locked(self):
+        while self._live_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._delete_locked(oldest)
+            self.stats['evictions'] += 1
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def dead_bytes(self):
+        return max(0, self._pack.tell() - len(PACK_MAGIC) - self._live_bytes)
+
+    def needs_compaction(self):
+        dead = self.dead_bytes()
+        return dead > 16 * 1024 * 1024 or (dead > 1024 * 1024 and dead > self._live_bytes)
+
+    def compact(self):
+        """Rewrite the pack with only live artifacts and swap it in atomically"""
+        with self._write_lock:
+            started = time.monotonic()
+            tmp_pack = self.pack_file.with_suffix('.pack.compact')
+            tmp_index = self.index_file.with_suffix('.idx.compact')
+            with self._read_lock:
+                if self._map_size < self._pack.tell():
+                    self._remap()
+                entries = list(self._index.items())
+                source = self._map
+            new_index = {}
+            with open(tmp_pack, 'wb') as pack, open(tmp_index, 'wb') as idx:
+                pack.write(PACK_MAGIC)
+                idx.write(INDEX_MAGIC)
+                for key, (offset, meta_len, payload_len) in entries:
+                    length = ENTRY_HEADER.size + meta_len + payload_len
+                    new_offset = pack.tell()
+                    pack.write(source[offset:offset + length])
+                    idx.write(INDEX_RECORD.pack(key, new_offset, meta_len, payload_len))
+                    new_index[key] = (new_offset, meta_len, payload_len)
+                pack.flush()
+                os.fsync(pack.fileno())
+                idx.flush()
+                os.fsync(idx.fileno())
+
+            reclaimed = self.dead_bytes()
+            with self._read_lock:
+                self._pack.close()
+                self._idx.close()
+                os.replace(tmp_pack, self.pack_file)
+                os.replace(tmp_index, self.index_file)
+                self._pack = open(self.pack_file, 'ab')
+                self._idx = open(self.index_file, 'ab')
+                self._index = new_index
+                self._remap()
+                self.stats['compactions'] += 1
+            print(f"🧹 Compacted artifact pack: reclaimed {reclaimed} bytes in "
+                  f"{round((time.monotonic() - started) * 1000, 1)}ms")
+
+    def _ensure_compactor(self):
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_loop, name='artifact-compactor', daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                if self.needs_compaction():
+                    self.compact()
+            except Exception as e:
+                print(f"⚠️ Artifact pack compaction failed: {e}")
+
+    def snapshot(self):
+        with self._read_lock:
+            return dict(
+                self.stats,
+                artifacts=len(self._index),
+                live_bytes=self._live_bytes,
+                pack_bytes=self._map_size,
+                max_bytes=self.max_bytes,
+                load_ms=self.load_ms,
+            )
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Offline static export for the BIAN UML Visualizer
+Renders the full diagram catalog with a pool of warm PlantUML processes and
+writes a self-contained bundle that index.html can browse without a server
+side renderer (any static file server will do)
+
+Usage:
+    python export_static.py --output dist/bian-static --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from plantuml_pipe import PlantUMLPipe, PlantUMLPipeError
+from render_governor import content_hash
+from svg_optimizer import optimize_svg
+
+BASE_DIR = Path(__file__).parent
+REPO_DIR = BASE_DIR.parent
+PUML_DIR = REPO_DIR / "ModularLandscape" / "PUML"
+ARCHITECTURE_DIR = REPO_DIR / "ModularLandscape"
+VOCABULARY_DIR = REPO_DIR / "Vocabulary"
+PLANTUML_JAR = REPO_DIR / "plantuml.jar"
+
+DEFAULT_FORMATS = ['svg', 'png']
+MANIFEST_NAME = 'static-manifest.json'
+# Bumped whenever post-processing changes so cached assets are re-rendered
+EXPORT_VERSION = 1
+
+UI_FILES = ['index.html', 'app.js', 'styles.css']
+VOCABULARY_EXTENSIONS = {'.puml', '.md', '.json', '.png'}
+
+# Per-process warm PlantUML instances, one per output format
+_worker_pipes = {}
+_worker_config = {}
+
+
+def collect_sources():
+    """Every diagram the UI can show, as (view id, source path)"""
+    sources = []
+    # Same listing as /api/diagrams
+    for puml_file in sorted(PUML_DIR.glob("*.puml")):
+        sources.append((f'diagram:{puml_file.name}', puml_file))
+    for puml_file in sorted(ARCHITECTURE_DIR.glob("*.puml")):
+        sources.append((f'architecture:{puml_file.name}', puml_file))
+    for puml_file in sorted(VOCABULARY_DIR.glob("*.puml")):
+        sources.append((f'datamodel:{puml_file.name}', puml_file))
+    return sources
+
+
+def _init_worker(plantuml_jar, java_options, timeout):
+    _worker_config.update(plantuml_jar=plantuml_jar, java_options=java_options, timeout=timeout)
+
+
+def _render_job(view, uml_content, output_format):
+    """Render one diagram in a pool worker using its warm PlantUML process"""
+    pipe = _worker_pipes.get(output_format)
+    if pipe is None:
+        pipe = PlantUMLPipe(
+            _worker_config['plantuml_jar'], output_format,
+            java_options=_worker_config['java_options'], timeout=_worker_config['timeout']
+        )
+        _worker_pipes[output_format] = pipe
+
+    started = time.monotonic()
+    try:
+        content = pipe.render(uml_content)
+    except PlantUMLPipeError as e:
+        return {'view': view, 'format': output_format, 'error': str(e)}
+
+    stats = None
+    if output_format == 'svg':
+        svg_text, stats = optimize_svg(content.decode('utf-8'), background='#FFFFFF')
+        content = svg_text.encode('utf-8')
+    return {
+        'view': view,
+        'format': output_format,
+        'content': content,
+        'svg_stats': stats,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def load_manifest(output_dir):
+    manifest_file = output_dir / MANIFEST_NAME
+    if manifest_file.exists():
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == EXPORT_VERSION:
+                return manifest
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable manifest {manifest_file}: {e}")
+    return {'version': EXPORT_VERSION, 'views': {}, 'renders': {}}
+
+
+def copy_if_changed(source, target):
+    """Copy a file unless the target already has identical content"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists() and target.stat().st_size == source.stat().st_size:
+        if hashlib.sha256(target.read_bytes()).digest() == hashlib.sha256(source.read_bytes()).digest():
+            return False
+    shutil.copy2(source, target)
+    return True
+
+
+def copy_ui(output_dir, tailwind_js=None):
+    """Copy the UI and the raw sources it fetches into the bundle"""
+    for name in UI_FILES:
+        copy_if_changed(BASE_DIR / name, output_dir / name)
+    for puml_file in PUML_DIR.glob("*.puml"):
+        copy_if_changed(puml_file, output_dir / "ModularLandscape" / "PUML" / puml_file.name)
+    for puml_file in ARCHITECTURE_DIR.glob("*.puml"):
+        copy_if_changed(puml_file, output_dir / "ModularLandscape" / puml_file.name)
+    for vocab_file in VOCABULARY_DIR.iterdir():
+        if vocab_file.suffix in VOCABULARY_EXTENSIONS:
+            copy_if_changed(vocab_file, output_dir / "Vocabulary" / vocab_file.name)
+
+    # Tailwind is loaded from a CDN; air-gapped bundles need a local copy
+    index_file = output_dir / 'index.html'
+    if tailwind_js:
+        copy_if_changed(Path(tailwind_js), output_dir / 'vendor' / 'tailwind.js')
+        html = index_file.read_text(encoding='utf-8')
+        index_file.write_text(
+            html.replace('https://cdn.tailwindcss.com', 'vendor/tailwind.js'), encoding='utf-8'
+        )
+    else:
+        print("⚠️ No --tailwind-js given; the bundle still loads Tailwind CSS from its CDN")
+
+
+def export(output_dir, formats, workers, force=False, tailwind_js=None, timeout=120):
+    output_dir = Path(output_dir)
+    assets_dir = output_dir / 'assets'
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'version': EXPORT_VERSION, 'views': {}, 'renders': {}} if force else load_manifest(output_dir)
+    renders = manifest['renders']
+
+    jobs = []
+    views = {}
+    for view, source in collect_sources():
+        with open(source, 'r', encoding='utf-8') as f:
+            uml_content = f.read()
+        digest = content_hash(uml_content)
+        views[view] = {
+            'source': str(source.relative_to(REPO_DIR)),
+            'hash': digest,
+            'assets': {},
+        }
+        for output_format in formats:
+            asset = renders.get(digest, {}).get(output_format)
+            if asset and (output_dir / asset).exists():
+                continue
+            jobs.append((view, digest, uml_content, output_format))
+
+    skipped = len(views) * len(formats) - len(jobs)
+    print(f"📦 {len(views)} diagrams x {len(formats)} formats: {len(jobs)} to render, {skipped} unchanged")
+
+    if not PLANTUML_JAR.exists() and jobs:
+        print(f"❌ PlantUML jar not found at {PLANTUML_JAR}")
+        return 1
+
+    failures = 0
+    if jobs:
+        # One warm JVM per worker and format; bounded heap per JVM
+        java_options = [f"-Xmx{os.environ.get('RENDER_MAX_HEAP_MB', 1024)}m"]
+        digests = {(view, fmt): digest for view, digest, _, fmt in jobs}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(str(PLANTUML_JAR), java_options, timeout)
+        ) as pool:
+            futures = [pool.submit(_render_job, view, uml_content, fmt)
+                       for view, _, uml_content, fmt in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                view, fmt = result['view'], result['format']
+                if 'error' in result:
+                    failures += 1
+                    print(f"❌ {view} ({fmt}): {result['error']}")
+                    continue
+                digest = digests[(view, fmt)]
+                asset = f"assets/{digest[:16]}.{fmt}"
+                (output_dir / asset).write_bytes(result['content'])
+                renders.setdefault(digest, {})[fmt] = asset
+                note = ''
+                if result['svg_stats']:
+                    stats = result['svg_stats']
+                    note = f", SVG {stats['original_bytes']} -> {stats['optimized_bytes']} bytes"
+                print(f"✅ {view} ({fmt}) in {result['seconds']}s{note}")
+
+    for view, entry in views.items():
+        entry['assets'] = dict(renders.get(entry['hash'], {}))
+    # Drop renders of sources that no longer exist
+    live_hashes = {entry['hash'] for entry in views.values()}
+    for digest in list(renders):
+        if digest not in live_hashes:
+            for asset in renders.pop(digest).values():
+                (output_dir / asset).unlink(missing_ok=True)
+
+    manifest.update({
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'formats': formats,
+        'views': views,
+        'renders': renders,
+    })
+    copy_ui(output_dir, tailwind_js)
+    with open(output_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"📁 Static bundle written to {output_dir} ({failures} failures)")
+    print(f"   Serve it with: python3 -m http.server --directory {output_dir}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the BIAN UML Visualizer as a static bundle')
+    parser.add_argument('--output', default=str(BASE_DIR / 'dist'), help='bundle directory')
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS), help='comma-separated output formats')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='parallel PlantUML workers')
+    parser.add_argument('--force', action='store_true', help='re-render everything, ignoring the manifest')
+    parser.add_argument('--tailwind-js', help='local Tailwind CSS script to bundle instead of the CDN')
+    parser.add_argument('--timeout', type=int, default=120, help='per-diagram render timeout in seconds')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    return export(args.output, formats, max(1, args.workers), args.force, args.tailwind_js, args.timeout)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
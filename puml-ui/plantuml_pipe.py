@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Long-lived PlantUML process for the BIAN UML Visualizer
+Keeps one JVM warm in -pipe mode and renders successive diagrams through it,
+avoiding the JVM start-up cost paid by one-shot subprocess renders
+"""
+
+import os
+import select
+import subprocess
+import threading
+import time
+
+PIPE_DELIMITER = b'___BIAN_PLANTUML_DIAGRAM_DELIMITER___'
+
+# Markers PlantUML writes to stderr or into the image when a render fails
+ERROR_INDICATORS = [
+    'An error has occured',
+    'An error has occurred',
+    'UnparsableGraphvizException',
+    'java.lang.',
+    'Cannot run program',
+]
+
+
+class PlantUMLPipeError(Exception):
+    """Raised when the warm PlantUML process fails or times out"""
+
+
+class PlantUMLPipe:
+    """A warm `java -jar plantuml.jar -pipe` process for one output format"""
+
+    def __init__(self, plantuml_jar, output_format='svg', java_options=None, timeout=60):
+        self.plantuml_jar = str(plantuml_jar)
+        self.output_format = output_format
+        self.java_options = list(java_options or [])
+        self.timeout = timeout
+        self.renders = 0
+        self._process = None
+        self._stderr_lines = []
+        self._stderr_lock = threading.Lock()
+
+    def _start(self):
+        cmd = ['java', '-Djava.awt.headless=true'] + self.java_options + [
+            '-jar', self.plantuml_jar,
+            f'-t{self.output_format}',
+            '-charset', 'UTF-8',
+            '-pipe',
+            '-pipedelimitor', PIPE_DELIMITER.decode('ascii'),
+        ]
+        self._process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._buffer = b''
+        threading.Thread(target=self._drain_stderr, args=(self._process,), daemon=True).start()
+        print(f"☕ Started warm PlantUML ({self.output_format}) pid={self._process.pid}")
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            with self._stderr_lock:
+                self._stderr_lines.append(line.decode('utf-8', 'ignore'))
+
+    def _take_stderr(self):
+        with self._stderr_lock:
+            lines, self._stderr_lines = self._stderr_lines, []
+        return ''.join(lines)
+
+    def render(self, uml_content):
+        """Render one diagram through the warm process and return its bytes"""
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+        self._take_stderr()
+
+        payload = uml_content.rstrip('\n') + '\n'
+        try:
+            self._process.stdin.write(payload.encode('utf-8'))
+            self._process.stdin.flush()
+            content = self._read_until_delimiter()
+        except (OSError, PlantUMLPipeError) as e:
+            self.close()
+            raise PlantUMLPipeError(f'PlantUML pipe failed: {e}')
+
+        self.renders += 1
+        errors = self._take_stderr()
+        if any(indicator in errors for indicator in ERROR_INDICATORS):
+            raise PlantUMLPipeError(errors.strip())
+        if self.output_format == 'svg':
+            text = content.decode('utf-8', 'ignore')
+            if any(indicator in text for indicator in ERROR_INDICATORS):
+                raise PlantUMLPipeError('PlantUML returned error SVG')
+        return content
+
+    def _read_until_delimiter(self):
+        deadline = time.monotonic() + self.timeout
+        stdout = self._process.stdout
+        fd = stdout.fileno()
+        while PIPE_DELIMITER not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PlantUMLPipeError(f'render timed out after {self.timeout}s')
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise PlantUMLPipeError('PlantUML process exited')
+            self._buffer += chunk
+
+        content, _, rest = self._buffer.partition(PIPE_DELIMITER)
+        # PlantUML terminates the delimiter with a newline
+        self._buffer = rest.lstrip(b'\r\n')
+        return content.rstrip(b'\r\n') if self.output_format == 'svg' else content
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._process = None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Navigation-aware predictive prerendering for the BIAN UML Visualizer
+Learns which view users open next (a first-order Markov model over view
+transitions) and speculatively renders the likely next diagrams while the
+render governor has spare capacity
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class NavigationModel:
+    """First-order Markov model of view-to-view transitions"""
+
+    def __init__(self, model_file=None, max_views=500):
+        self.model_file = Path(model_file) if model_file else None
+        self.max_views = max_views
+        self.transitions = {}  # from view -> {to view: count}
+        self.formats = {}      # view -> {format: count}
+        self._lock = threading.Lock()
+        self._last_persist = 0.0
+        self._load()
+
+    def record(self, from_view, to_view, output_format='png'):
+        """Record that a user moved from one view to another"""
+        with self._lock:
+            view_formats = self.formats.setdefault(to_view, {})
+            view_formats[output_format] = view_formats.get(output_format, 0) + 1
+            # Re-requesting the current view in another format is not a transition
+            if from_view and from_view != to_view:
+                counts = self.transitions.setdefault(from_view, {})
+                counts[to_view] = counts.get(to_view, 0) + 1
+            if len(self.transitions) > self.max_views:
+                self.transitions.pop(next(iter(self.transitions)))
+            if time.monotonic() - self._last_persist > 10:
+                self._persist()
+
+    def predict(self, view, limit=3, min_probability=0.15):
+        """Most likely next views as (view, probability), highest first"""
+        with self._lock:
+            counts = dict(self.transitions.get(view, {}))
+        total = sum(counts.values())
+        if not total:
+            return []
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return [(to_view, count / total) for to_view, count in ranked[:limit]
+                if count / total >= min_probability]
+
+    def likely_formats(self, view, default='png'):
+        """Formats requested for a view as (format, share), most common first"""
+        with self._lock:
+            counts = dict(self.formats.get(view, {}))
+        total = sum(counts.values())
+        if not total:
+            return [(default, 1.0)]
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return [(fmt, count / total) for fmt, count in ranked]
+
+    def _load(self):
+        if not self.model_file or not self.model_file.exists():
+            return
+        try:
+            with open(self.model_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.transitions = data.get('transitions', {})
+            self.formats = data.get('formats', {})
+        except Exception as e:
+            print(f"⚠️ Could not load navigation model from {self.model_file}: {e}")
+
+    def _persist(self):
+        if not self.model_file:
+            return
+        self._last_persist = time.monotonic()
+        try:
+            self.model_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.model_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'transitions': self.transitions, 'formats': self.formats}, f)
+            os.replace(tmp_file, self.model_file)
+        except Exception as e:
+            print(f"⚠️ Could not persist navigation model: {e}")
+
+
+class Prerenderer:
+    """Low-priority background worker rendering predicted views
+
+    ``render_view(view, output_format)`` does the actual work and is expected
+    to use speculative admission, so it is refused or cancelled whenever
+    real renders need the capacity.
+    """
+
+    def __init__(self, model, governor, render_view, max_queue=8, min_score=0.1):
+        self.model = model
+        self.governor = governor
+        self.render_view = render_view
+        self.max_queue = max_queue
+        self.min_score = min_score
+        self.stats = {'scheduled': 0, 'rendered': 0, 'cached': 0, 'skipped': 0, 'cancelled': 0, 'failed': 0}
+        self._queue = []  # (score, view, format), highest score first
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def on_navigation(self, from_view, to_view, output_format='png'):
+        """Record a transition and reschedule predictions from the new view"""
+        self.model.record(from_view, to_view, output_format)
+        jobs = []
+        for next_view, probability in self.model.predict(to_view):
+            for fmt, share in self.model.likely_formats(next_view):
+                score = probability * share
+                if score >= self.min_score:
+                    jobs.append((score, next_view, fmt))
+        jobs.sort(reverse=True)
+
+        with self._condition:
+            # Predictions from the previous view are stale now
+            self._queue = jobs[:self.max_queue]
+            self.stats['scheduled'] += len(self._queue)
+            self._condition.notify()
+        self._ensure_started()
+        return [{'view': view, 'format': fmt, 'score': round(score, 3)} for score, view, fmt in jobs]
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='prerender', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                score, view, fmt = self._queue.pop(0)
+
+            if not self.governor.has_spare_capacity():
+                self.stats['skipped'] += 1
+                continue
+            try:
+                outcome = self.render_view(view, fmt) or 'failed'
+            except Exception as e:
+                print(f"⚠️ Prerender of {view} ({fmt}) failed: {e}")
+                outcome = 'failed'
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+            print(f"🔮 Prerender {view} ({fmt}, p={score:.2f}): {outcome}")
+
+    def snapshot(self):
+        with self._condition:
+            queued = len(self._queue)
+        return dict(self.stats, queued=queued)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Render dispatcher for the BIAN UML Visualizer
+Load-balances renders across registered render workers by queue depth. The
+in-process PlantUML pipeline is one worker; remote render_worker.py daemons
+are others. Workers are health-checked in the background and a render that
+fails on one worker is retried on the next.
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from render_governor import RenderRejected
+
+
+class WorkerBusy(Exception):
+    """Raised when a worker's governor cannot admit a render right now"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerUnavailable(Exception):
+    """Raised when a worker cannot be reached or fails outside PlantUML"""
+
+
+class RenderWorker:
+    """Common bookkeeping for a render worker"""
+
+    def __init__(self, name, capacity=1):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.healthy = True
+        self.in_flight = 0
+        self.reported_depth = 0
+        self.renders = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_checked = None
+        self.avg_seconds = None
+        self._lock = threading.Lock()
+
+    def queue_depth(self):
+        return max(self.in_flight, self.reported_depth)
+
+    def load(self):
+        """Queue depth relative to the worker's render slots"""
+        return self.queue_depth() / self.capacity
+
+    def render(self, uml_content, output_format):
+        """Render and post-process; returns the same result dict as render_diagram"""
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            result = self._render(uml_content, output_format)
+        except (WorkerUnavailable, WorkerBusy) as e:
+            self.last_error = str(e)
+            if isinstance(e, WorkerUnavailable):
+                self.failures += 1
+                self.healthy = False
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        elapsed = time.monotonic() - started
+        self.renders += 1
+        self.avg_seconds = elapsed if self.avg_seconds is None else 0.8 * self.avg_seconds + 0.2 * elapsed
+        return result
+
+    def check_health(self):
+        try:
+            self._check_health()
+            self.healthy = True
+            self.last_error = None
+        except WorkerUnavailable as e:
+            self.healthy = False
+            self.last_error = str(e)
+        self.last_checked = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        return self.healthy
+
+    def _render(self, uml_content, output_format):
+        raise NotImplementedError
+
+    def _check_health(self):
+        raise NotImplementedError
+
+    def snapshot(self):
+        return {
+            'name': self.name,
+            'type': type(self).__name__,
+            'healthy': self.healthy,
+            'capacity': self.capacity,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth(),
+            'renders': self.renders,
+            'failures': self.failures,
+            'avg_seconds': round(self.avg_seconds, 3) if self.avg_seconds is not None else None,
+            'last_error': self.last_error,
+            'last_checked': self.last_checked,
+        }
+
+
+class LocalWorker(RenderWorker):
+    """Renders in this process through the local render governor"""
+
+    def __init__(self, render_fn, governor, plantuml_jar):
+        super().__init__('local', capacity=governor.cpu_slots)
+        self.render_fn = render_fn
+        self.governor = governor
+        self.plantuml_jar = plantuml_jar
+        self.healthy = plantuml_jar.exists()
+
+    def queue_depth(self):
+        # Includes prerenders and anything else admitted by the same governor
+        state = self.governor.snapshot()
+        return state['active_processes'] + state['waiting']
+
+    def _render(self, uml_content, output_format):
+        try:
+            return self.render_fn(uml_content, output_format)
+        except RenderRejected as e:
+            if e.status == 503:
+                raise WorkerBusy(str(e), e.retry_after)
+            raise
+
+    def _check_health(self):
+        if not self.plantuml_jar.exists():
+            raise WorkerUnavailable(f'PlantUML jar not found at {self.plantuml_jar}')
+
+
+class RemoteWorker(RenderWorker):
+    """A render_worker.py daemon reached over HTTP"""
+
+    def __init__(self, url, timeout=180, health_timeout=5):
+        super().__init__(url.rstrip('/'))
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.health_timeout = health_timeout
+
+    def _render(self, uml_content, output_format):
+        body = json.dumps({'uml_content': uml_content, 'format': output_format}).encode('utf-8')
+        req = urllib.request.Request(
+            f'{self.url}/render', data=body, headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                self._update_depth(response.headers)
+                content = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            self._update_depth(e.headers)
+            error = self._error_message(e)
+            if e.code == 503:
+                raise WorkerBusy(error, _retry_after(e.headers))
+            if e.code == 413:
+                raise RenderRejected(error, status=413)
+            if e.code == 422:
+                # PlantUML itself failed; another worker would fail the same way
+                return {'success': False, 'error': error}
+            raise WorkerUnavailable(f'{self.name} answered {e.code}: {error}')
+        except (OSError, ValueError) as e:
+            raise WorkerUnavailable(f'{self.name} unreachable: {e}')
+
+        if output_format == 'svg':
+            content = content.decode('utf-8')
+        svg_stats = headers.get('X-SVG-Stats')
+        entry = {
+            'content': content,
+            'format': output_format,
+            'svg_stats': json.loads(svg_stats) if svg_stats else None,
+            'fallback': headers.get('X-Render-Fallback') == '1',
+        }
+        return {'success': True, 'entry': entry}
+
+    def _check_health(self):
+        try:
+            with urllib.request.urlopen(f'{self.url}/status', timeout=self.health_timeout) as response:
+                status = json.loads(response.read())
+        except (OSError, ValueError) as e:
+            raise WorkerUnavailable(f'{self.name} unreachable: {e}')
+        self.capacity = max(1, status.get('capacity', self.capacity))
+        self.reported_depth = status.get('queue_depth', 0)
+        if not status.get('ready'):
+            raise WorkerUnavailable(status.get('error') or f'{self.name} is not ready')
+
+    def _update_depth(self, headers):
+        depth = headers.get('X-Worker-Queue-Depth') if headers else None
+        if depth is not None and depth.isdigit():
+            self.reported_depth = int(depth)
+
+    @staticmethod
+    def _error_message(error):
+        try:
+            return json.loads(error.read()).get('error') or error.reason
+        except (OSError, ValueError, AttributeError):
+            return str(error.reason)
+
+
+def _retry_after(headers):
+    value = headers.get('Retry-After') if headers else None
+    return int(value) if value and value.isdigit() else None
+
+
+class RenderDispatcher:
+    """Picks the least loaded healthy worker and fails over to the next"""
+
+    def __init__(self, workers=(), health_interval=10):
+        self.health_interval = health_interval
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self.stats = {'dispatched': 0, 'retries': 0, 'exhausted': 0}
+        for worker in workers:
+            self.add_worker(worker)
+
+    def add_worker(self, worker):
+        with self._lock:
+            existing = self._workers.get(worker.name)
+            if existing is not None:
+                return existing
+            self._workers[worker.name] = worker
+        worker.check_health()
+        print(f"🛠️ Render worker registered: {worker.name} "
+              f"({'healthy' if worker.healthy else 'unhealthy'}, {worker.capacity} slots)")
+        return worker
+
+    def remove_worker(self, name):
+        with self._lock:
+            worker = self._workers.pop(name.rstrip('/'), None)
+        if worker is not None:
+            print(f"🛠️ Render worker removed: {name}")
+        return worker is not None
+
+    def workers(self):
+        with self._lock:
+            return list(self._workers.values())
+
+    def candidates(self):
+        """Healthy workers by load, then unhealthy ones as a last resort"""
+        workers = self.workers()
+        healthy = sorted((w for w in workers if w.healthy),
+                         key=lambda w: (w.load(), w.avg_seconds or 0))
+        unhealthy = [w for w in workers if not w.healthy]
+        return healthy + unhealthy
+
+    def render(self, uml_content, output_format='svg'):
+        """Render on the least loaded worker; returns (result, worker name)
+
+        Raises RenderRejected if every worker is busy or unavailable.
+        """
+        busy = []
+        errors = []
+        self.stats['dispatched'] += 1
+        for attempt, worker in enumerate(self.candidates()):
+            if attempt:
+                self.stats['retries'] += 1
+            try:
+                return worker.render(uml_content, output_format), worker.name
+            except WorkerBusy as e:
+                busy.append(e.retry_after or 1)
+                print(f"🚦 Render worker {worker.name} busy: {e}")
+            except WorkerUnavailable as e:
+                errors.append(str(e))
+                print(f"❌ Render worker {worker.name} failed, trying the next one: {e}")
+
+        self.stats['exhausted'] += 1
+        if busy:
+            raise RenderRejected('All render workers are busy', status=503, retry_after=min(busy))
+        detail = '; '.join(errors) or 'no render workers registered'
+        raise RenderRejected(f'No render worker available: {detail}', status=503, retry_after=self.health_interval)
+
+    def start_health_checks(self):
+        if self._health_thread and self._health_thread.is_alive():
+            return
+        self._health_thread = threading.Thread(target=self._health_loop, name='render-worker-health', daemon=True)
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            for worker in self.workers():
+                was_healthy = worker.healthy
+                if worker.check_health() != was_healthy:
+                    print(f"🩺 Render worker {worker.name} is now "
+                          f"{'healthy' if worker.healthy else 'unhealthy'}")
+
+    def snapshot(self):
+        return dict(self.stats, workers=[worker.snapshot() for worker in self.workers()])
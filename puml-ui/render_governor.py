@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Render governor for the BIAN UML Visualizer
+Estimates the cost of PlantUML renders, admits them against a CPU/memory
+budget and applies per-process resource limits and adaptive timeouts
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Lines that declare a diagram element (component, class, package, ...)
+ELEMENT_PATTERN = re.compile(
+    r'^\s*(component|class|interface|package|rectangle|node|entity|actor|'
+    r'database|folder|frame|cloud|queue|artifact|usecase|object|enum|'
+    r'abstract|card|file|storage|collections|\*+)\b',
+    re.IGNORECASE
+)
+# Relationship arrows such as ->, -->, ..>, <|--, --*
+RELATION_PATTERN = re.compile(r'[-.]+[>|*o]|[<|*o][-.]+')
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def content_hash(uml_content):
+    """Stable hash of UML source used to key render history and caches"""
+    return hashlib.sha256(uml_content.encode('utf-8')).hexdigest()
+
+
+class RenderRejected(Exception):
+    """Raised when a render cannot be admitted within the configured limits"""
+
+    def __init__(self, message, status=503, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RenderCancelled(Exception):
+    """Raised when a speculative render is cancelled to make room for real work"""
+
+
+class RenderTicket:
+    """Limits granted to a single admitted render"""
+
+    def __init__(self, cost, heap_mb, timeout, speculative=False):
+        self.cost = cost
+        self.heap_mb = heap_mb
+        self.timeout = timeout
+        self.speculative = speculative
+        self.cancelled = False
+        self.admitted_at = time.monotonic()
+        self._processes = set()
+        self._process_lock = threading.Lock()
+
+    @property
+    def content_hash(self):
+        return self.cost['content_hash']
+
+    def attach(self, process):
+        """Track a running child process so it can be killed on cancellation"""
+        with self._process_lock:
+            if self.cancelled:
+                process.kill()
+            self._processes.add(process)
+
+    def detach(self, process):
+        with self._process_lock:
+            self._processes.discard(process)
+
+    def cancel(self):
+        """Cancel the render and kill any child process it is running"""
+        with self._process_lock:
+            self.cancelled = True
+            for process in self._processes:
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+
+
+class RenderGovernor:
+    """Admission control, resource limits and timing history for PlantUML renders"""
+
+    def __init__(self, history_file=None):
+        self.cpu_slots = _env_int('RENDER_MAX_PROCESSES', os.cpu_count() or 2)
+        self.memory_budget_mb = _env_int('RENDER_MEMORY_BUDGET_MB', 2048)
+        self.min_heap_mb = _env_int('RENDER_MIN_HEAP_MB', 256)
+        self.max_heap_mb = _env_int('RENDER_MAX_HEAP_MB', 1024)
+        self.max_content_chars = _env_int('RENDER_MAX_CONTENT_CHARS', 2_000_000)
+        self.max_elements = _env_int('RENDER_MAX_ELEMENTS', 20_000)
+        self.queue_timeout = _env_int('RENDER_QUEUE_TIMEOUT', 30)
+        self.min_timeout = _env_int('RENDER_MIN_TIMEOUT', 10)
+        self.max_timeout = _env_int('RENDER_MAX_TIMEOUT', 120)
+        # Extra virtual address space on top of the heap for the JVM itself
+        # (code cache, metaspace, thread stacks); 0 disables RLIMIT_AS
+        self.address_space_overhead_mb = _env_int('RENDER_ADDRESS_SPACE_OVERHEAD_MB', 1024)
+        self.history_limit = _env_int('RENDER_HISTORY_LIMIT', 2000)
+
+        self.history_file = Path(history_file) if history_file else None
+        self.history = {}
+        # Seconds per unit of estimated work, learned across all diagrams
+        self.seconds_per_unit = None
+
+        self._lock = threading.Condition()
+        self._active_processes = 0
+        self._active_memory_mb = 0
+        self._waiting = 0
+        self._speculative = set()
+        self._cancelled_speculative = 0
+        self._last_persist = 0.0
+        self._load_history()
+
+    # ------------------------------------------------------------------
+    # Cost estimation
+    # ------------------------------------------------------------------
+    def estimate_cost(self, uml_content):
+        """Estimate render cost from the UML source and past renders"""
+        lines = uml_content.count('\n') + 1
+        elements = 0
+        relations = 0
+        for line in uml_content.splitlines():
+            if ELEMENT_PATTERN.match(line):
+                elements += 1
+            elif RELATION_PATTERN.search(line):
+                relations += 1
+
+        # GraphViz layout dominates for large diagrams, so elements and
+        # relationships weigh much more than plain lines
+        units = 1.0 + lines * 0.01 + elements * 0.1 + relations * 0.15
+        digest = content_hash(uml_content)
+        seen = self.history.get(digest)
+        if seen:
+            predicted = seen['avg_seconds']
+        elif self.seconds_per_unit:
+            predicted = units * self.seconds_per_unit
+        else:
+            predicted = 2.0 + units * 0.05
+
+        heap_mb = self.min_heap_mb + elements * 2 + relations
+        heap_mb = max(self.min_heap_mb, min(self.max_heap_mb, heap_mb))
+
+        return {
+            'content_hash': digest,
+            'chars': len(uml_content),
+            'lines': lines,
+            'elements': elements,
+            'relations': relations,
+            'units': round(units, 2),
+            'predicted_seconds': round(predicted, 2),
+            'heap_mb': heap_mb,
+            'from_history': bool(seen),
+        }
+
+    def timeout_for(self, cost):
+        """Adaptive per-diagram timeout learned from render history"""
+        seen = self.history.get(cost['content_hash'])
+        if seen:
+            timeout = max(seen['avg_seconds'] * 3, seen['max_seconds'] * 1.5) + 5
+        else:
+            timeout = cost['predicted_seconds'] * 4 + 10
+        return int(max(self.min_timeout, min(self.max_timeout, math.ceil(timeout))))
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+    def check_limits(self, uml_content, cost):
+        """Reject diagrams that exceed hard size limits before queueing"""
+        if len(uml_content) > self.max_content_chars:
+            raise RenderRejected(
+                f'UML content too large ({len(uml_content)} characters, limit {self.max_content_chars})',
+                status=413
+            )
+        if cost['elements'] + cost['relations'] > self.max_elements:
+            raise RenderRejected(
+                f"UML diagram too complex ({cost['elements']} elements, "
+                f"{cost['relations']} relationships, limit {self.max_elements})",
+                status=413
+            )
+
+    def _fits(self, heap_mb):
+        if self._active_processes >= self.cpu_slots:
+            return False
+        # A job larger than the whole budget may still run on an idle host
+        if self._active_processes == 0:
+            return True
+        return self._active_memory_mb + heap_mb <= self.memory_budget_mb
+
+    def ticket_for(self, uml_content):
+        """Limits for a render that bypasses admission (e.g. nested fallbacks)"""
+        cost = self.estimate_cost(uml_content)
+        return RenderTicket(cost, cost['heap_mb'], self.timeout_for(cost))
+
+    def has_spare_capacity(self):
+        """True when nothing is queued and a process slot is free"""
+        with self._lock:
+            return self._waiting == 0 and self._active_processes < self.cpu_slots
+
+    def _cancel_speculative(self):
+        for ticket in list(self._speculative):
+            if not ticket.cancelled:
+                ticket.cancel()
+                self._cancelled_speculative += 1
+
+    @contextmanager
+    def admit(self, uml_content, wait=None, speculative=False):
+        """Block until the render fits the budget, then yield its ticket
+
+        Speculative renders never wait: they are refused unless capacity is
+        free right now, and are cancelled as soon as a real render would
+        otherwise have to queue behind them.
+        """
+        cost = self.estimate_cost(uml_content)
+        self.check_limits(uml_content, cost)
+        ticket = RenderTicket(cost, cost['heap_mb'], self.timeout_for(cost), speculative=speculative)
+        wait = self.queue_timeout if wait is None else wait
+        deadline = time.monotonic() + wait
+
+        with self._lock:
+            if speculative:
+                if self._waiting or not self._fits(ticket.heap_mb):
+                    raise RenderRejected('No spare render capacity for speculative work')
+            else:
+                if not self._fits(ticket.heap_mb):
+                    self._cancel_speculative()
+                self._waiting += 1
+                try:
+                    while not self._fits(ticket.heap_mb):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RenderRejected(
+                                'Render capacity exhausted, please retry shortly',
+                                status=503,
+                                retry_after=max(1, int(cost['predicted_seconds']))
+                            )
+                        self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active_processes += 1
+            self._active_memory_mb += ticket.heap_mb
+            if speculative:
+                self._speculative.add(ticket)
+            ticket.admitted_at = time.monotonic()
+
+        try:
+            yield ticket
+        finally:
+            with self._lock:
+                self._active_processes -= 1
+                self._active_memory_mb -= ticket.heap_mb
+                self._speculative.discard(ticket)
+                self._lock.notify_all()
+
+    # ------------------------------------------------------------------
+    # Per-process limits
+    # ------------------------------------------------------------------
+    def java_options(self, ticket):
+        """JVM flags bounding heap and the JVM's own virtual reservations"""
+        return [
+            f'-Xmx{ticket.heap_mb}m',
+            '-XX:+UseSerialGC',
+            '-XX:ReservedCodeCacheSize=64m',
+            '-XX:CompressedClassSpaceSize=64m',
+            '-XX:MaxMetaspaceSize=128m',
+        ]
+
+    def preexec_fn(self, ticket):
+        """Build a preexec_fn applying rlimits to the child process (POSIX only)"""
+        if resource is None or os.name != 'posix':
+            return None
+
+        address_space = None
+        if self.address_space_overhead_mb > 0:
+            address_space = (ticket.heap_mb + self.address_space_overhead_mb) * 1024 * 1024
+        # CPU seconds are summed over JVM threads, so allow some parallelism
+        cpu_seconds = ticket.timeout * 2 + 5
+
+        def apply_limits():
+            if address_space:
+                resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+
+        return apply_limits
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+    def record(self, ticket, seconds, success=True):
+        """Record how long a render took so future estimates can adapt"""
+        if not success:
+            return
+        with self._lock:
+            digest = ticket.content_hash
+            entry = self.history.pop(digest, None)
+            if entry:
+                entry['samples'] += 1
+                # Exponentially weighted so diagrams that changed cost adapt quickly
+                entry['avg_seconds'] = round(entry['avg_seconds'] * 0.7 + seconds * 0.3, 3)
+                entry['max_seconds'] = round(max(entry['max_seconds'], seconds), 3)
+            else:
+                entry = {'samples': 1, 'avg_seconds': round(seconds, 3), 'max_seconds': round(seconds, 3)}
+            entry['units'] = ticket.cost['units']
+            self.history[digest] = entry  # re-insert to keep most recent last
+            while len(self.history) > self.history_limit:
+                self.history.pop(next(iter(self.history)))
+
+            rate = seconds / max(ticket.cost['units'], 1.0)
+            if self.seconds_per_unit is None:
+                self.seconds_per_unit = rate
+            else:
+                self.seconds_per_unit = self.seconds_per_unit * 0.9 + rate * 0.1
+
+            if time.monotonic() - self._last_persist > 5:
+                self._persist_history()
+
+    def _load_history(self):
+        if not self.history_file or not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.history = data.get('diagrams', {})
+            self.seconds_per_unit = data.get('seconds_per_unit')
+        except Exception as e:
+            print(f"⚠️ Could not load render history from {self.history_file}: {e}")
+
+    def _persist_history(self):
+        if not self.history_file:
+            return
+        self._last_persist = time.monotonic()
+        try:
+            self.history_file.parent.mkdir(parents=True, exist_ok=True)
+            # Render workers on the same host share the history file
+            tmp_file = self.history_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'seconds_per_unit': self.seconds_per_unit, 'diagrams': self.history}, f)
+            os.replace(tmp_file, self.history_file)
+        except Exception as e:
+            print(f"⚠️ Could not persist render history: {e}")
+
+    def snapshot(self):
+        """Current governor state for the health endpoint"""
+        with self._lock:
+            return {
+                'active_processes': self._active_processes,
+                'max_processes': self.cpu_slots,
+                'active_memory_mb': self._active_memory_mb,
+                'memory_budget_mb': self.memory_budget_mb,
+                'waiting': self._waiting,
+                'speculative_processes': len(self._speculative),
+                'speculative_cancelled': self._cancelled_speculative,
+                'history_entries': len(self.history),
+                'seconds_per_unit': round(self.seconds_per_unit, 4) if self.seconds_per_unit else None,
+            }
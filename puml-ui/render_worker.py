@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Render worker daemon for the BIAN UML Visualizer
+Wraps the local PlantUML pipeline and its SVG/PNG post-processing behind a
+small HTTP API so the visualizer can spread renders across hosts
+
+Usage:
+    python render_worker.py --port 7801 --register http://localhost:7777
+"""
+
+import argparse
+import json
+import socket
+import sys
+import threading
+import urllib.request
+
+from flask import Flask, jsonify, request, Response
+
+from plantuml_renderer import PLANTUML_JAR, governor, render_diagram, check_java_availability
+from render_governor import RenderRejected
+
+app = Flask(__name__)
+
+MIMETYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg'}
+
+# Java does not appear or disappear while the worker runs
+JAVA_AVAILABLE = check_java_availability()
+
+def queue_depth():
+    state = governor.snapshot()
+    return state['active_processes'] + state['waiting']
+
+@app.route('/render', methods=['POST'])
+def render():
+    """Render one diagram; 422 if PlantUML fails, 413/503 if the governor refuses it"""
+    data = request.get_json(silent=True)
+    if not data or 'uml_content' not in data:
+        return jsonify({'error': 'No UML content provided'}), 400
+    output_format = data.get('format', 'svg')
+
+    try:
+        result = render_diagram(data['uml_content'], output_format)
+    except RenderRejected as e:
+        headers = {'X-Worker-Queue-Depth': str(queue_depth())}
+        if e.retry_after:
+            headers['Retry-After'] = str(e.retry_after)
+        return jsonify({'error': str(e)}), e.status, headers
+    if not result['success']:
+        return jsonify({'error': result['error']}), 422, {'X-Worker-Queue-Depth': str(queue_depth())}
+
+    entry = result['entry']
+    headers = {
+        'X-Render-Fallback': '1' if entry['fallback'] else '0',
+        'X-Worker-Queue-Depth': str(queue_depth()),
+    }
+    if entry.get('svg_stats'):
+        headers['X-SVG-Stats'] = json.dumps(entry['svg_stats'], separators=(',', ':'))
+    return Response(entry['content'], mimetype=MIMETYPES.get(output_format, f'image/{output_format}'),
+                    headers=headers)
+
+@app.route('/status')
+def status():
+    """Readiness and load, polled by the dispatcher's health checks"""
+    ready = PLANTUML_JAR.exists() and JAVA_AVAILABLE
+    error = None
+    if not PLANTUML_JAR.exists():
+        error = f'PlantUML jar not found at {PLANTUML_JAR}'
+    elif not JAVA_AVAILABLE:
+        error = 'Java is not available'
+    return jsonify({
+        'ready': ready,
+        'error': error,
+        'capacity': governor.cpu_slots,
+        'queue_depth': queue_depth(),
+        'render_governor': governor.snapshot(),
+    })
+
+def register(app_url, worker_url):
+    """Announce this worker to a running visualizer"""
+    body = json.dumps({'url': worker_url}).encode('utf-8')
+    req = urllib.request.Request(f"{app_url.rstrip('/')}/api/workers", data=body,
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=10):
+            print(f"📡 Registered with {app_url} as {worker_url}")
+    except OSError as e:
+        print(f"⚠️ Could not register with {app_url}: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a BIAN UML Visualizer render worker')
+    parser.add_argument('--host', default='0.0.0.0', help='interface to listen on')
+    parser.add_argument('--port', type=int, default=7801, help='port to listen on')
+    parser.add_argument('--register', metavar='APP_URL', help='visualizer to register with on startup')
+    parser.add_argument('--advertise', metavar='URL', help='URL the visualizer should use to reach this worker')
+    args = parser.parse_args(argv)
+
+    print(f"🛠️ Render worker on port {args.port}: {governor.cpu_slots} slots, "
+          f"jar={'found' if PLANTUML_JAR.exists() else 'missing'}, java={'yes' if JAVA_AVAILABLE else 'no'}")
+    if args.register:
+        host = socket.getfqdn() if args.host == '0.0.0.0' else args.host
+        # Registered once the server is listening, so the first health check passes
+        threading.Timer(1.0, register, (args.register, args.advertise or f'http://{host}:{args.port}')).start()
+    # Threaded so /status answers while renders are running
+    app.run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
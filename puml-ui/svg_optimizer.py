@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+SVG optimizer for the BIAN UML Visualizer
+Streaming post-processing of PlantUML SVG output: minifies markup, rounds
+coordinates, factors repeated inline styles into shared classes and strips
+comments, processing instructions and metadata
+"""
+
+import re
+import time
+from xml.parsers import expat
+
+# Attributes whose numeric values are coordinates or lengths
+NUMERIC_ATTRIBUTES = {
+    'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+    'width', 'height', 'points', 'd', 'viewBox', 'transform',
+    'textLength', 'font-size', 'stroke-width', 'dx', 'dy',
+}
+# Elements whose character data is significant
+TEXT_ELEMENTS = {'text', 'tspan', 'style', 'script', 'title', 'desc', 'textPath', 'a'}
+# Elements dropped together with their subtree
+STRIPPED_ELEMENTS = {'metadata'}
+
+FLOAT_PATTERN = re.compile(r'-?\d+\.\d+(?:[eE][-+]?\d+)?')
+WHITE_RECT_PATTERN = re.compile(r'^#?f{3}(?:f{3})?$', re.IGNORECASE)
+
+
+def _round_numbers(value, precision):
+    """Round every float in an attribute value, dropping redundant zeros"""
+    def shorten(match):
+        rounded = f'{float(match.group(0)):.{precision}f}'.rstrip('0').rstrip('.')
+        return '0' if rounded in ('', '-0') else rounded
+    return FLOAT_PATTERN.sub(shorten, value)
+
+
+def _normalize_style(style, precision):
+    declarations = [d.strip() for d in style.split(';') if d.strip()]
+    normalized = []
+    for declaration in declarations:
+        prop, _, val = declaration.partition(':')
+        normalized.append(f'{prop.strip()}:{_round_numbers(val.strip(), precision)}')
+    return ';'.join(normalized)
+
+
+def _escape_attr(value):
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('"', '&quot;').replace('\n', '&#10;'))
+
+
+def _escape_text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _feed(parser, svg_text, chunk_size):
+    """Feed the document to an expat parser in bounded chunks"""
+    for start in range(0, len(svg_text), chunk_size):
+        parser.Parse(svg_text[start:start + chunk_size], False)
+    parser.Parse('', True)
+
+
+class _StyleCounter:
+    """First streaming pass: count inline style usage and detect a white backdrop"""
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.counts = {}
+        self.depth = 0
+        self.has_white_rect = False
+
+    def start(self, name, attrs):
+        self.depth += 1
+        if name == 'rect' and WHITE_RECT_PATTERN.match(attrs.get('fill', '')):
+            self.has_white_rect = True
+        if self.depth > 1 and attrs.get('style'):
+            style = _normalize_style(attrs['style'], self.precision)
+            self.counts[style] = self.counts.get(style, 0) + 1
+
+    def end(self, name):
+        self.depth -= 1
+
+
+class _SVGWriter:
+    """Second streaming pass: emit the minified document as events arrive"""
+
+    def __init__(self, precision, classes, background, has_white_rect):
+        self.precision = precision
+        self.classes = classes
+        self.background = background
+        self.has_white_rect = has_white_rect
+        self.out = []
+        self.stack = []
+        self.pending_open = False
+        self.skip_depth = 0
+        self.in_cdata = False
+
+    def _close_pending(self):
+        if self.pending_open:
+            self.out.append('>')
+            self.pending_open = False
+
+    def start(self, name, attrs):
+        if self.skip_depth or name in STRIPPED_ELEMENTS:
+            self.skip_depth += 1
+            return
+        self._close_pending()
+        is_root = not self.stack
+        self.stack.append(name)
+
+        attrs = dict(attrs)
+        style = attrs.pop('style', None)
+        if style:
+            style = _normalize_style(style, self.precision)
+            shared = None if is_root else self.classes.get(style)
+            if shared:
+                existing = attrs.get('class')
+                attrs['class'] = f'{existing} {shared}' if existing else shared
+            elif style:
+                attrs['style'] = style
+        if is_root and self.background and 'background' not in attrs.get('style', ''):
+            prefix = attrs.get('style', '')
+            attrs['style'] = f'{prefix};background:{self.background}' if prefix else f'background:{self.background}'
+
+        parts = [f'<{name}']
+        for key, value in attrs.items():
+            if key in NUMERIC_ATTRIBUTES:
+                value = _round_numbers(value, self.precision)
+            parts.append(f' {key}="{_escape_attr(value)}"')
+        self.out.append(''.join(parts))
+        self.pending_open = True
+
+        if is_root:
+            self._close_pending()
+            if self.classes:
+                rules = ''.join(f'.{cls}{{{style}}}' for style, cls in self.classes.items())
+                self.out.append(f'<style>{_escape_text(rules)}</style>')
+            if self.background and not self.has_white_rect:
+                self.out.append(f'<rect x="0" y="0" width="100%" height="100%" fill="{self.background}"/>')
+
+    def end(self, name):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        self.stack.pop()
+        if self.pending_open:
+            self.out.append('/>')
+            self.pending_open = False
+        else:
+            self.out.append(f'</{name}>')
+
+    def data(self, text):
+        if self.skip_depth:
+            return
+        if self.in_cdata:
+            self._close_pending()
+            self.out.append(text)
+            return
+        if not (self.stack and self.stack[-1] in TEXT_ELEMENTS) and not text.strip():
+            return  # inter-element whitespace
+        self._close_pending()
+        self.out.append(_escape_text(text))
+
+    def start_cdata(self):
+        if not self.skip_depth:
+            self._close_pending()
+            self.out.append('<![CDATA[')
+            self.in_cdata = True
+
+    def end_cdata(self):
+        if not self.skip_depth:
+            self.out.append(']]>')
+            self.in_cdata = False
+
+
+def optimize_svg(svg_text, precision=2, min_style_uses=2, background=None, chunk_size=65536):
+    """Optimize an SVG document, returning (optimized_svg, stats)
+
+    Comments, processing instructions, the XML declaration, DOCTYPE and
+    <metadata> are dropped. Inline styles used at least ``min_style_uses``
+    times are moved into a shared <style> block. If ``background`` is given
+    the root gets that background colour and a backdrop rect, unless the
+    document already has a white rect.
+    """
+    started = time.monotonic()
+    original_bytes = len(svg_text.encode('utf-8'))
+
+    counter = _StyleCounter(precision)
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = counter.start
+    parser.EndElementHandler = counter.end
+    _feed(parser, svg_text, chunk_size)
+
+    classes = {}
+    for style, uses in counter.counts.items():
+        if uses >= min_style_uses:
+            classes[style] = f's{len(classes)}'
+
+    writer = _SVGWriter(precision, classes, background, counter.has_white_rect)
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = writer.start
+    parser.EndElementHandler = writer.end
+    parser.CharacterDataHandler = writer.data
+    parser.StartCdataSectionHandler = writer.start_cdata
+    parser.EndCdataSectionHandler = writer.end_cdata
+    # Comments, processing instructions and the DOCTYPE have no handlers
+    # and are therefore dropped
+    _feed(parser, svg_text, chunk_size)
+
+    optimized = ''.join(writer.out)
+    optimized_bytes = len(optimized.encode('utf-8'))
+    stats = {
+        'original_bytes': original_bytes,
+        'optimized_bytes': optimized_bytes,
+        'saved_bytes': original_bytes - optimized_bytes,
+        'reduction_pct': round(100.0 * (original_bytes - optimized_bytes) / original_bytes, 1) if original_bytes else 0.0,
+        'shared_classes': len(classes),
+        'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+    return optimized, stats
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Linked-field lineage for the BIAN UML Visualizer
+Connects core tables to their fields, the vocabulary keys linked to those
+fields and the API operations (context usages) that use each key. Adjacency
+and transitive closures are precomputed when the graph is built, so
+table-to-operation and operation-to-table queries are dictionary lookups.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+NODE_KINDS = ('table', 'field', 'key', 'operation')
+
+# PlantUML element per node kind
+PUML_SHAPES = {
+    'table': 'database',
+    'field': 'rectangle',
+    'key': 'card',
+    'operation': 'usecase',
+}
+
+
+def node_id(kind, name):
+    return f'{kind}:{name}'
+
+
+def split_node_id(node):
+    kind, _, name = node.partition(':')
+    return kind, name
+
+
+def linked_fields(value):
+    """Normalise a linkedField value into a list of field names
+
+    Values are lists of strings, and a string may hold several
+    comma-separated fields.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    fields = []
+    for item in value:
+        fields.extend(part.strip() for part in str(item).split(',') if part.strip())
+    return fields
+
+
+def table_of(field):
+    """Core table of a field such as AA.PRD.DES.ACCOUNT_ShortTitle"""
+    table, _, column = field.partition('_')
+    return table if column else field
+
+
+class LineageGraph:
+    """Immutable lineage graph built from (domain, entry) pairs"""
+
+    def __init__(self, entries, version=None):
+        started = time.monotonic()
+        self.version = version
+        # Each usage is one table -> field -> key -> operation chain; the
+        # operation is None for entries without contexts
+        self.usages = []
+        for domain, entry in entries:
+            self._add_entry(domain, entry)
+
+        self.adjacency = defaultdict(set)   # node -> direct downstream nodes
+        self.reverse = defaultdict(set)     # node -> direct upstream nodes
+        downstream = defaultdict(set)
+        upstream = defaultdict(set)
+        usages_by_node = defaultdict(list)
+        for index, chain in enumerate(self.usages):
+            nodes = [node for node in chain if node is not None]
+            for position, node in enumerate(nodes):
+                usages_by_node[node].append(index)
+                if position:
+                    self.adjacency[nodes[position - 1]].add(node)
+                    self.reverse[node].add(nodes[position - 1])
+                # Closures follow the chains, so a context-level override
+                # never links an operation to the entry-level field
+                downstream[node].update(nodes[position + 1:])
+                upstream[node].update(nodes[:position])
+
+        self.nodes = set(usages_by_node)
+        self.downstream = {node: self._group(related) for node, related in downstream.items()}
+        self.upstream = {node: self._group(related) for node, related in upstream.items()}
+        self.usages_by_node = dict(usages_by_node)
+
+        # Operations and keys may be looked up without their domain prefix
+        self.aliases = defaultdict(set)
+        for node in self.nodes:
+            kind, name = split_node_id(node)
+            if kind in ('key', 'operation'):
+                self.aliases[node_id(kind, name.split('/', 1)[-1])].add(node)
+
+        self._puml_cache = {}
+        self._puml_lock = threading.Lock()
+        self.build_ms = round((time.monotonic() - started) * 1000, 2)
+
+    def _add_entry(self, domain, entry):
+        key = entry.get('key') if isinstance(entry, dict) else None
+        if not key:
+            return
+        key_node = node_id('key', f'{domain}/{key}')
+        entry_fields = linked_fields(entry.get('linkedField'))
+        contexts = [context for context in entry.get('contexts') or [] if isinstance(context, dict)]
+        if not contexts:
+            contexts = [{}]
+        for context in contexts:
+            # A context-level linkedField overrides the entry-level one
+            fields = linked_fields(context['linkedField']) if 'linkedField' in context else entry_fields
+            usage = context.get('usage')
+            operation = node_id('operation', f'{domain}/{usage}') if usage else None
+            if not fields:
+                # Keys without a core field still belong to their operations
+                self.usages.append((None, None, key_node, operation))
+            for field in fields:
+                self.usages.append((node_id('table', table_of(field)), node_id('field', field), key_node, operation))
+
+    @staticmethod
+    def _group(nodes):
+        grouped = {kind: [] for kind in NODE_KINDS}
+        for node in nodes:
+            kind, name = split_node_id(node)
+            grouped[kind].append(name)
+        return {kind: tuple(sorted(names)) for kind, names in grouped.items()}
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def resolve(self, kind, name):
+        """Node id for a kind and name, or None if unknown or ambiguous"""
+        node = node_id(kind, name)
+        if node in self.nodes:
+            return node
+        matches = self.aliases.get(node, ())
+        return next(iter(matches)) if len(matches) == 1 else None
+
+    def related(self, node, direction='downstream', kind=None):
+        """Precomputed transitive neighbours of a node, grouped by kind"""
+        closure = (self.downstream if direction == 'downstream' else self.upstream).get(node)
+        if closure is None:
+            closure = self._group(())
+        return closure[kind] if kind else closure
+
+    def operations_for_table(self, table):
+        return self.related(node_id('table', table), 'downstream', 'operation')
+
+    def tables_for_operation(self, operation):
+        node = self.resolve('operation', operation)
+        return self.related(node, 'upstream', 'table') if node else ()
+
+    def describe(self, node):
+        kind, name = split_node_id(node)
+        return {
+            'node': node,
+            'kind': kind,
+            'name': name,
+            'upstream': self.related(node, 'upstream'),
+            'downstream': self.related(node, 'downstream'),
+            'usages': len(self.usages_by_node.get(node, ())),
+        }
+
+    def summary(self):
+        counts = {kind: 0 for kind in NODE_KINDS}
+        for node in self.nodes:
+            counts[split_node_id(node)[0]] += 1
+        return dict(counts, usages=len(self.usages), version=self.version, build_ms=self.build_ms)
+
+    # ------------------------------------------------------------------
+    # Diagrams
+    # ------------------------------------------------------------------
+    def subgraph_puml(self, node):
+        """PlantUML source for every lineage chain that passes through a node"""
+        with self._puml_lock:
+            cached = self._puml_cache.get(node)
+        if cached is not None:
+            return cached
+
+        aliases = {}
+        edges = set()
+        for index in self.usages_by_node.get(node, ()):
+            chain = [step for step in self.usages[index] if step is not None]
+            for step in chain:
+                aliases.setdefault(step, f'N{len(aliases)}')
+            edges.update(zip(chain, chain[1:]))
+
+        kind, name = split_node_id(node)
+        lines = [
+            '@startuml',
+            'left to right direction',
+            'skinparam BackgroundColor white',
+            f'title Lineage of {kind} {name}',
+            '',
+        ]
+        for step in sorted(aliases, key=lambda n: (NODE_KINDS.index(split_node_id(n)[0]), n)):
+            step_kind, step_name = split_node_id(step)
+            label = step_name.partition('_')[2] or step_name if step_kind == 'field' else step_name
+            highlight = ' #FFE08A' if step == node else ''
+            lines.append(f'{PUML_SHAPES[step_kind]} "{label}" as {aliases[step]}{highlight}')
+        lines.append('')
+        for source, target in sorted(edges):
+            lines.append(f'{aliases[source]} --> {aliases[target]}')
+        lines.append('@enduml')
+        puml = '\n'.join(lines) + '\n'
+
+        with self._puml_lock:
+            self._puml_cache[node] = puml
+        return puml
+
+
+class LineageIndex:
+    """Keeps a LineageGraph in step with a VocabularyStore"""
+
+    def __init__(self, vocabulary_store):
+        self.vocabulary_store = vocabulary_store
+        self._graph = None
+        self._lock = threading.Lock()
+
+    def graph(self):
+        """The current graph, rebuilt once after each vocabulary change"""
+        version = self.vocabulary_store.version
+        graph = self._graph
+        if graph is not None and graph.version == version:
+            return graph
+        with self._lock:
+            if self._graph is None or self._graph.version != version:
+                self._graph = LineageGraph(self.vocabulary_store.iter_entries(), version=version)
+                print(f"🧬 Lineage graph built: {len(self._graph.nodes)} nodes, "
+                      f"{len(self._graph.usages)} usages in {self._graph.build_ms}ms")
+            return self._graph
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Vocabulary store for the BIAN UML Visualizer
+Streams per-domain vocabulary files (JSON arrays of entries) into memory one
+entry at a time and, on reload, applies only the entries whose content hash
+changed
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+# FinalVocab.json predates per-domain files and holds the deposits vocabulary
+LEGACY_VOCABULARY_FILES = {'FinalVocab.json': 'deposits'}
+VOCABULARY_SUFFIX = '_vocabulary.json'
+
+
+class VocabularyFormatError(ValueError):
+    """Raised when a vocabulary file is not a JSON array of objects"""
+
+
+def iter_json_array(path, chunk_size=65536):
+    """Yield the elements of a top-level JSON array without loading the whole file
+
+    Only the element currently being decoded is buffered, so memory stays
+    bounded by the largest single entry rather than the file size.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    with open(path, 'r', encoding='utf-8') as f:
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            # Drop what has already been decoded before growing the buffer
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        while True:
+            separators = ' \t\r\n,' if started else ' \t\r\n'
+            while position < len(buffer) and buffer[position] in separators:
+                position += 1
+            if position >= len(buffer):
+                if eof:
+                    raise VocabularyFormatError(f'{path}: unexpected end of file')
+                fill()
+                continue
+
+            if not started:
+                if buffer[position] != '[':
+                    raise VocabularyFormatError(f'{path}: expected a JSON array')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:
+                # A value touching the end of the buffer may be truncated
+                fill()
+                continue
+            position = end
+            yield element
+
+
+def entry_hash(entry):
+    """Content hash of a vocabulary entry, independent of key order"""
+    canonical = json.dumps(entry, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def discover_vocabulary_files(vocabulary_dir):
+    """Map each domain to its vocabulary file"""
+    vocabulary_dir = Path(vocabulary_dir)
+    files = {}
+    for name, domain in LEGACY_VOCABULARY_FILES.items():
+        if (vocabulary_dir / name).exists():
+            files[domain] = vocabulary_dir / name
+    for path in sorted(vocabulary_dir.glob(f'*{VOCABULARY_SUFFIX}')):
+        files[path.name[:-len(VOCABULARY_SUFFIX)]] = path
+    return files
+
+
+class VocabularyStore:
+    """In-memory vocabulary entries per domain, reloaded incrementally"""
+
+    def __init__(self, vocabulary_dir, reload_interval=5, batch_size=200):
+        self.vocabulary_dir = Path(vocabulary_dir)
+        self.reload_interval = reload_interval
+        self.batch_size = batch_size
+        self._domains = {}        # domain -> {key: (hash, entry)}
+        self._file_state = {}     # domain -> (path, mtime_ns, size)
+        self._reload_stats = {}   # domain -> stats of the last reload
+        self._version = 0         # bumped whenever any entry changes
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+    def reload(self, force=False):
+        """Ingest new or changed vocabulary files; returns per-domain stats"""
+        with self._reload_lock:
+            files = discover_vocabulary_files(self.vocabulary_dir)
+            results = {}
+            for domain, path in files.items():
+                stat = path.stat()
+                state = (str(path), stat.st_mtime_ns, stat.st_size)
+                if not force and self._file_state.get(domain) == state:
+                    continue
+                try:
+                    results[domain] = self._ingest(domain, path)
+                    self._file_state[domain] = state
+                except (OSError, ValueError) as e:
+                    # Keep serving the previous version of this domain
+                    print(f"❌ Failed to ingest vocabulary {path.name}: {e}")
+                    results[domain] = {'error': str(e)}
+            for domain in set(self._domains) - set(files):
+                with self._lock:
+                    removed = len(self._domains.pop(domain))
+                    self._version += 1
+                self._file_state.pop(domain, None)
+                results[domain] = {'removed': removed, 'file_deleted': True}
+            self._reload_stats.update(results)
+            return results
+
+    def _ingest(self, domain, path):
+        started = time.monotonic()
+        with self._lock:
+            current = self._domains.setdefault(domain, {})
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'skipped': 0}
+        seen = set()
+        pending = []
+
+        def apply(batch):
+            # Short critical sections so readers are never blocked for long
+            with self._lock:
+                for key, digest, entry in batch:
+                    current[key] = (digest, entry)
+
+        for entry in iter_json_array(path):
+            key = entry.get('key') if isinstance(entry, dict) else None
+            if not key:
+                stats['skipped'] += 1
+                continue
+            seen.add(key)
+            digest = entry_hash(entry)
+            existing = current.get(key)
+            if existing and existing[0] == digest:
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if existing else 'added'] += 1
+            pending.append((key, digest, entry))
+            if len(pending) >= self.batch_size:
+                apply(pending)
+                pending = []
+        if pending:
+            apply(pending)
+
+        with self._lock:
+            for key in [key for key in current if key not in seen]:
+                del current[key]
+                stats['removed'] += 1
+            if stats['added'] or stats['updated'] or stats['removed']:
+                self._version += 1
+
+        stats.update(
+            file=path.name,
+            entries=len(seen),
+            elapsed_ms=round((time.monotonic() - started) * 1000, 1),
+            loaded_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        )
+        print(f"📚 Vocabulary {domain}: {stats['added']} added, {stats['updated']} updated, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged in {stats['elapsed_ms']}ms")
+        return stats
+
+    def reload_in_background(self, force=False):
+        thread = threading.Thread(target=self.reload, kwargs={'force': force},
+                                  name='vocabulary-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def start_watching(self):
+        """Load once in the background and poll the files for changes"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(target=self._watch, name='vocabulary-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"⚠️ Vocabulary reload failed: {e}")
+            if self.reload_interval <= 0:
+                return
+            time.sleep(self.reload_interval)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    @property
+    def version(self):
+        """Changes whenever entries are added, updated or removed"""
+        return self._version
+
+    def domains(self):
+        with self._lock:
+            counts = {domain: len(entries) for domain, entries in self._domains.items()}
+        return [
+            dict(domain=domain, entries=count, last_reload=self._reload_stats.get(domain))
+            for domain, count in sorted(counts.items())
+        ]
+
+    def get(self, domain, key):
+        with self._lock:
+            found = self._domains.get(domain, {}).get(key)
+        return found[1] if found else None
+
+    def entries(self, domain, search=None, offset=0, limit=100):
+        """Entries of a domain, optionally filtered by a search term, paginated"""
+        with self._lock:
+            if domain not in self._domains:
+                return None
+            items = [entry for _, entry in self._domains[domain].values()]
+        if search:
+            term = search.lower()
+            items = [entry for entry in items
+                     if term in entry.get('key', '').lower() or term in entry.get('description', '').lower()]
+        return {'total': len(items), 'offset': offset, 'limit': limit, 'entries': items[offset:offset + limit]}
+
+    def iter_entries(self):
+        """Snapshot of (domain, entry) pairs across all domains"""
+        with self._lock:
+            snapshot = [(domain, entry) for domain, entries in self._domains.items()
+                        for _, entry in entries.values()]
+        return iter(snapshot)